@@ -160,6 +160,9 @@ from ._wrapper_ import (
 # Expose session class for advanced users and tests
 from .core.session_client import session_client_class as session
 
+# Expose sharded session class for parallel workloads
+from .core.session_shard import session_shard_class as sharded_session
+
 # Expose current session and Wine API
 from ._wrapper_ import (
 	current_session,
@@ -60,6 +60,12 @@ if __name__ == '__main__':
 	parser.add_argument(
 		'--log_write', type = int, nargs = 1
 		)
+	parser.add_argument(
+		'--server_workers', type = int, nargs = 1
+		)
+	parser.add_argument(
+		'--memsync_stream', type = int, nargs = 1
+		)
 	args = parser.parse_args()
 
 	# Generate parameter dict
@@ -71,7 +77,9 @@ if __name__ == '__main__':
 		'log_write': bool(args.log_write[0]),
 		'log_level': args.log_level[0],
 		'port_socket_wine': args.port_socket_wine[0],
-		'port_socket_unix': args.port_socket_unix[0]
+		'port_socket_unix': args.port_socket_unix[0],
+		'server_workers': args.server_workers[0],
+		'memsync_stream': args.memsync_stream[0]
 		}
 
 	# Fire up wine server session with parsed parameters
@@ -65,16 +65,20 @@ class callback_translator_client_class:
 		# Store memsync definition
 		self.memsync_d = memsync_d
 
+		# Compile definitions into call plans for arguments and return value
+		self.argtypes_p = self.data.arg_list_compile(self.argtypes_d)
+		self.restype_p = self.data.return_msg_compile(self.restype_d)
+
 
 	def __call__(self, arg_message_list, arg_memory_list):
 
 		# Log status
-		self.log.out('[callback-client] Trying to call callback routine "%s" ...' % self.name)
+		self.log.out('[callback-client] Trying to call callback routine "%s" ...', self.name)
 
 		try:
 
 			# Unpack arguments
-			args_list = self.data.arg_list_unpack(arg_message_list, self.argtypes_d)
+			args_list = self.data.arg_list_unpack(arg_message_list, self.argtypes_p)
 
 			# Unpack pointer data
 			self.data.server_unpack_memory_list(args_list, arg_memory_list, self.memsync_d)
@@ -103,9 +107,9 @@ class callback_translator_client_class:
 			# Push traceback to log
 			self.log.err(traceback.format_exc())
 
-			# Pack return package and return it
+			# Pack return package and return it (arguments are not synced back)
 			return {
-				'args': arg_message_list,
+				'args': [],
 				'return_value': return_value,
 				'memory': arg_memory_list,
 				'success': False,
@@ -117,11 +121,11 @@ class callback_translator_client_class:
 			# Pack memory for return
 			self.data.server_pack_memory_list(args_list, return_value, arg_memory_list, self.memsync_d)
 
-			# Get new arg message list
-			arg_message_list = self.data.arg_list_pack(args_list, self.argtypes_d)
+			# Get new arg message list, only arguments which may have changed
+			arg_message_list = self.data.arg_list_pack_out(args_list, self.argtypes_p)
 
 			# Pack return value
-			return_message = self.data.return_msg_pack(return_value, self.restype_d)
+			return_message = self.data.return_msg_pack(return_value, self.restype_p)
 
 			# Log status
 			self.log.out('[callback-client] ... done.')
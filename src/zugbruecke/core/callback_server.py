@@ -65,14 +65,18 @@ class callback_translator_server_class:
 		# Store memsync definition
 		self.memsync_d = memsync_d
 
+		# Compile definitions into call plans for arguments and return value
+		self.argtypes_p = self.data.arg_list_compile(self.argtypes_d)
+		self.restype_p = self.data.return_msg_compile(self.restype_d)
+
 
 	def __call__(self, *args):
 
 		# Log status
-		self.log.out('[callback-server] Trying to call callback routine "%s" ...' % self.name)
+		self.log.out('[callback-server] Trying to call callback routine "%s" ...', self.name)
 
 		# Log status
-		self.log.out('[callback-server] ... parameters are "%r". Packing and pushing to client ...' % (args,))
+		self.log.out('[callback-server] ... parameters are "%r". Packing and pushing to client ...', args)
 
 		try:
 
@@ -92,7 +96,7 @@ class callback_translator_server_class:
 		try:
 
 			# Pack arguments and call RPC callback function (packed arguments are shipped to Unix side)
-			return_dict = self.handler(self.data.arg_list_pack(args, self.argtypes_d), mem_package_list)
+			return_dict = self.handler(self.data.arg_list_pack(args, self.argtypes_p), mem_package_list)
 
 		except Exception as e:
 
@@ -102,6 +106,9 @@ class callback_translator_server_class:
 			# Push traceback to log
 			self.log.err(traceback.format_exc())
 
+			# Hand back shared memory and drop streams
+			self.data.client_release_memory_list(mem_package_list)
+
 			raise e
 
 		try:
@@ -110,14 +117,10 @@ class callback_translator_server_class:
 			self.log.out('[callback-server] ... received feedback from client, unpacking ...')
 
 			# Unpack return dict (for pointers and structs)
-			self.data.arg_list_sync(
-				args,
-				self.data.arg_list_unpack(return_dict['args'], self.argtypes_d),
-				self.argtypes_d
-				)
+			self.data.arg_list_sync_out(args, return_dict['args'], self.argtypes_p)
 
 			# Unpack return value
-			return_value = self.data.return_msg_unpack(return_dict['return_value'], self.restype_d)
+			return_value = self.data.return_msg_unpack(return_dict['return_value'], self.restype_p)
 
 			# Unpack memory (call may have failed partially only)
 			self.data.client_unpack_memory_list(args, return_value, return_dict['memory'], self.memsync_d)
@@ -132,6 +135,11 @@ class callback_translator_server_class:
 
 			raise e
 
+		finally:
+
+			# Hand back shared memory and drop streams, which were not read
+			self.data.client_release_memory_list(mem_package_list)
+
 		# Raise the original error if call was not a success
 		if not return_dict['success']:
 			self.log.out('[callback-server] ... call raised an error.')
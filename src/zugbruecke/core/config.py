@@ -71,6 +71,21 @@ def get_default_config():
 	# Define Wine-Python version
 	cfg['version'] = '3.5.3'
 
+	# Minimum size of memsync buffers in bytes, which are transferred through shared memory
+	cfg['memsync_shared'] = 0 # Disabled by default
+
+	# Size of chunks in bytes, in which larger memsync buffers are streamed
+	cfg['memsync_stream'] = 0 # Disabled by default
+
+	# Ask a running daemon for a pre-booted Wine-Python server
+	cfg['daemon'] = False # Disabled by default
+
+	# Number of threads handling requests (e.g. DLL calls) on Wine side
+	cfg['server_workers'] = 8
+
+	# Cache prototypes of routines on disk and preload them into new sessions
+	cfg['prototype_cache'] = False # Disabled by default
+
 	# Default config directory
 	cfg['dir'] = __get_default_config_directory__()
 
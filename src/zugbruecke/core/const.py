@@ -38,6 +38,28 @@ GROUP_STRUCT = 4
 GROUP_FUNCTION = 8
 
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# RPC
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+# Pickle protocol understood by all supported Python versions on both sides
+RPC_PICKLE_PROTOCOL = 4
+
+# Minimum size in bytes of memory sections, which are sent out-of-band (not embedded in pickles)
+RPC_BUFFER_MIN = 65536
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# MEMSYNC
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+# Directions of memory sections
+MEMSYNC_DIRECTIONS = ('in', 'out', 'inout')
+
+# Size in bytes of blocks, which are compared for finding changed (dirty) ranges of memory sections
+MEMSYNC_DIFF_BLOCK = 4096
+
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CTYPES FLAGS
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	src/zugbruecke/core/daemon.py: Keeps pre-booted Wine Python servers ready for sessions
+
+	Required to run on platform / side: [UNIX]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+
+from .config import get_module_config
+from .interpreter import (
+	get_server_command,
+	interpreter_session_class
+	)
+from .lib import generate_session_id
+from .log import log_class
+from .rpc import (
+	mp_client_safe_connect,
+	mp_server_class
+	)
+from .wineenv import (
+	create_wine_prefix,
+	setup_wine_python,
+	set_wine_env
+	)
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONSTANTS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+DAEMON_AUTHKEY = 'zugbruecke_daemon'
+
+# Seconds a server may take to boot
+BOOT_TIMEOUT = 30.0
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_daemon_socket_path(directory):
+
+	# Unix socket of daemon lives in zugbruecke's root directory
+	return os.path.join(directory, 'daemon.sock')
+
+
+def run_daemon(pool_size = 1):
+
+	# Start daemon with configuration of module
+	daemon = daemon_class(pool_size = pool_size)
+
+	# Shut down servers on signals
+	signal.signal(signal.SIGINT, lambda signum, frame: daemon.terminate())
+	signal.signal(signal.SIGTERM, lambda signum, frame: daemon.terminate())
+
+	# Block until terminated
+	daemon.serve_forever()
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# DAEMON CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class daemon_class():
+
+
+	def __init__(self, parameter = {}, pool_size = 1, check_interval = 5.0):
+
+		# Fill empty parameters with default values and/or config file contents
+		self.p = get_module_config(parameter)
+		self.id = self.p['id']
+
+		# Number of idle servers per arch, version and directory
+		self.pool_size = pool_size
+
+		# Seconds between health checks
+		self.check_interval = check_interval
+
+		# Endpoint for idle servers: status and log messages (instead of a session)
+		self.server_rpc = mp_server_class(
+			('localhost', 0), 'zugbruecke_unix'
+			)
+		self.server_rpc.register_function(self.__set_server_status__, 'set_server_status')
+
+		# Start daemon logging, idle servers log here
+		self.log = log_class(self.id, self.p, rpc_server = self.server_rpc)
+
+		# Log status
+		self.log.out('[daemon] STARTING ...')
+
+		# Idle servers by (arch, version, directory)
+		self.pools = {}
+
+		# Number of servers currently booting by (arch, version, directory)
+		self.booting = {}
+
+		# Servers handed out to sessions by id
+		self.busy = {}
+
+		# Readiness of booting servers by id
+		self.ready = {}
+
+		# Guards pools, booting, busy and ready
+		self.lock = threading.Lock()
+
+		# Guards Wine environment variables while booting
+		self.boot_lock = threading.Lock()
+
+		# Daemon is up
+		self.up = True
+
+		# Set once daemon serves sessions
+		self.serving = threading.Event()
+
+		# Set once daemon is down
+		self.down = threading.Event()
+
+		# Endpoint for sessions: Unix socket, only accessible by owner (authentication key is public)
+		self.socket_path = get_daemon_socket_path(self.p['dir'])
+		os.makedirs(self.p['dir'], mode = 0o700, exist_ok = True)
+		if os.path.exists(self.socket_path):
+			os.remove(self.socket_path)
+		self.session_rpc = mp_server_class(
+			self.socket_path, DAEMON_AUTHKEY, log = self.log,
+			terminate_function = self.__terminate__
+			)
+		umask = os.umask(0o077)
+		try:
+			self.session_rpc.listen()
+		finally:
+			os.umask(umask)
+		self.session_rpc.register_function(self.__acquire__, 'acquire')
+		self.session_rpc.register_function(self.__release__, 'release')
+		self.session_rpc.register_function(self.session_rpc.terminate, 'terminate')
+
+		# Log status
+		self.log.out('[daemon] STARTED.')
+
+
+	def serve_forever(self):
+
+		# Receive status and logs from idle servers
+		self.server_rpc.server_forever_in_thread()
+
+		# Start health checks
+		t = threading.Thread(target = self.__check_servers_forever__)
+		t.daemon = True
+		t.start()
+
+		# Serve sessions
+		self.session_rpc.server_forever_in_thread()
+
+		# Log status
+		self.log.out('[daemon] Listening on "%s" ...', self.socket_path)
+		self.serving.set()
+
+		# Block until terminated (waiting in steps keeps signals working)
+		while not self.down.wait(1.0):
+			pass
+
+
+	def terminate(self):
+
+		self.session_rpc.terminate()
+
+
+	def __acquire__(self, arch, version, directory):
+		"""
+		Exposed interface
+		"""
+
+		key = (arch, version, directory)
+
+		# Log status
+		self.log.out('[daemon] Session asks for server %r ...', key)
+
+		# Get an idle server if there is one
+		with self.lock:
+			pool = self.pools.setdefault(key, [])
+			server = pool.pop(0) if len(pool) > 0 else None
+
+		# Idle server must be healthy, otherwise boot one right away
+		if server is not None and not self.__check_server__(server):
+			self.__kill_server__(server)
+			server = None
+		if server is None:
+			self.log.out('[daemon] ... no idle server, booting ...')
+			server = self.__boot_server__(key)
+
+		# Server now belongs to a session (unless daemon went down while booting)
+		with self.lock:
+			up = self.up
+			if up:
+				self.busy[server['id']] = server
+		if not up:
+			self.__kill_server__(server)
+			raise OSError('daemon is terminating')
+
+		# Replace server in pool
+		self.__refill_pool_in_thread__(key)
+
+		# Log status
+		self.log.out('[daemon] ... handing out server "%s".', server['id'])
+
+		return {
+			'id': server['id'],
+			'port_socket_wine': server['p']['port_socket_wine']
+			}
+
+
+	def __boot_server__(self, key):
+
+		arch, version, directory = key
+
+		# Parameters of new server
+		server_id = generate_session_id()
+		parameter = self.p.copy()
+		parameter.update({
+			'id': server_id,
+			'arch': arch,
+			'version': version,
+			'dir': directory,
+			'port_socket_unix': self.server_rpc.socket_path[1],
+			'port_socket_wine': 0 # Picked by server and reported with its status
+			})
+		parameter['command_dict'] = get_server_command(server_id, parameter)
+
+		# Environment variables for Wine are process-wide
+		with self.boot_lock:
+
+			# Install wine-python
+			setup_wine_python(arch, version, directory)
+
+			# Initialize Wine session
+			create_wine_prefix(set_wine_env(directory, arch))
+
+			# Set by server once it is listening or by interpreter if Wine Python exits
+			ready = threading.Event()
+			with self.lock:
+				self.ready[server_id] = (ready, parameter)
+
+			# Start Wine Python server
+			interpreter_session = interpreter_session_class(
+				server_id, parameter, self.log, on_exit = lambda exit_code: ready.set()
+				)
+
+		server = {
+			'id': server_id,
+			'key': key,
+			'p': parameter,
+			'interpreter': interpreter_session,
+			'client': None,
+			'born': time.time()
+			}
+
+		# Wait for server to appear
+		try:
+			if not ready.wait(BOOT_TIMEOUT):
+				raise TimeoutError('server "%s" was not up after %0.2f seconds' % (server_id, BOOT_TIMEOUT))
+			if interpreter_session.exit_code is not None:
+				raise OSError('Wine Python of server "%s" exited with code %d during boot' % (
+					server_id, interpreter_session.exit_code
+					))
+			server['client'] = mp_client_safe_connect(
+				('localhost', parameter['port_socket_wine']), 'zugbruecke_wine'
+				)
+		except:
+			self.__kill_server__(server)
+			raise
+		finally:
+			with self.lock:
+				self.ready.pop(server_id)
+
+		return server
+
+
+	def __check_server__(self, server):
+
+		# Process must be alive
+		if server['interpreter'].proc_winepython.poll() is not None:
+			return False
+
+		# Server must answer
+		try:
+			return server['client'].__get_handler_status__()
+		except:
+			return False
+
+
+	def __check_servers_forever__(self):
+
+		while self.up:
+
+			time.sleep(self.check_interval)
+
+			with self.lock:
+				idle = [(key, server) for key, pool in self.pools.items() for server in pool]
+				busy = list(self.busy.values())
+
+			# Replace idle servers, which are not healthy anymore
+			for key, server in idle:
+				if self.__check_server__(server):
+					continue
+				self.log.out('[daemon] Idle server "%s" is not healthy, recycling ...', server['id'])
+				with self.lock:
+					if server in self.pools[key]:
+						self.pools[key].remove(server)
+				self.__kill_server__(server)
+				self.__refill_pool_in_thread__(key)
+
+			# Forget servers, whose sessions have ended
+			for server in busy:
+				if server['interpreter'].proc_winepython.poll() is not None:
+					self.__release__(server['id'])
+
+
+	def __kill_server__(self, server):
+
+		try:
+			server['interpreter'].terminate()
+		except:
+			self.log.err(traceback.format_exc())
+
+
+	def __refill_pool__(self, key):
+
+		while self.up:
+
+			# Is another server required?
+			with self.lock:
+				if len(self.pools.setdefault(key, [])) + self.booting.get(key, 0) >= self.pool_size:
+					return
+				self.booting[key] = self.booting.get(key, 0) + 1
+
+			try:
+				server = self.__boot_server__(key)
+			except:
+				self.log.err(traceback.format_exc())
+				return
+			finally:
+				with self.lock:
+					self.booting[key] -= 1
+
+			# Servers, which finish booting after the daemon went down, are not kept
+			with self.lock:
+				up = self.up
+				if up:
+					self.pools[key].append(server)
+			if not up:
+				self.__kill_server__(server)
+				return
+
+			# Log status
+			self.log.out('[daemon] Server "%s" for %r is ready.', server['id'], key)
+
+
+	def __refill_pool_in_thread__(self, key):
+
+		t = threading.Thread(target = self.__refill_pool__, args = (key,))
+		t.daemon = True
+		t.start()
+
+
+	def __release__(self, server_id):
+		"""
+		Exposed interface
+		"""
+
+		# Servers are not re-used after a session, they are recycled
+		with self.lock:
+			server = self.busy.pop(server_id, None)
+
+		if server is None:
+			return
+
+		# Log status
+		self.log.out('[daemon] Recycling server "%s" ...', server_id)
+
+		self.__kill_server__(server)
+
+
+	def __set_server_status__(self, server_id, status, port_socket_wine = None):
+
+		# Idle servers report here once they are listening
+		with self.lock:
+			ready, parameter = self.ready.get(server_id, (None, None))
+		if status and ready is not None:
+			parameter['port_socket_wine'] = port_socket_wine
+			ready.set()
+
+
+	def __terminate__(self):
+
+		# Log status
+		self.log.out('[daemon] TERMINATING ...')
+
+		with self.lock:
+
+			# No more health checks or refills, servers booting right now are killed once up
+			self.up = False
+
+			servers = [server for pool in self.pools.values() for server in pool] + list(self.busy.values())
+			self.pools.clear()
+			self.busy.clear()
+
+		# Shut down all servers
+		for server in servers:
+			self.__kill_server__(server)
+
+		# Stop endpoint for idle servers
+		self.server_rpc.terminate()
+
+		# Wake up endpoint for sessions so it notices termination (without handshake, it may not accept yet)
+		s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		s.settimeout(1.0)
+		try:
+			s.connect(self.socket_path)
+		except OSError:
+			pass
+		finally:
+			s.close()
+
+		# Remove its socket
+		self.session_rpc.server.close()
+
+		# Log status
+		self.log.out('[daemon] TERMINATED.')
+
+		# Terminate log
+		self.log.terminate()
+
+		# Release serve_forever
+		self.down.set()
@@ -37,6 +37,9 @@ from .arg_contents import arguments_contents_class
 from .arg_definition import arguments_definition_class
 from .mem_contents import memory_contents_class
 from .mem_definition import memory_definition_class
+from .mem_pinned import pinned_memory_class
+from .mem_shared import shared_memory_class
+from .mem_streamed import streamed_memory_class
 
 from ..const import _FUNCFLAG_STDCALL
 
@@ -59,14 +62,25 @@ class data_class(
 			_FUNCFLAG_STDCALL: {}
 			},
 		'func_handle': {},
-		'struct_type': {}
+		'struct_type': {},
+		'type_d': {}, # Registered types by id
+		'type_w': {}, # Registered types by id, as shipped
+		'type_id': {} # Ids of registered types by type
 		}
 
 
-	def __init__(self, log, is_server, callback_client = None, callback_server = None):
+	def __init__(self, log, is_server, callback_client = None, callback_server = None,
+		shared_memory = None, pinned_memory = None, streamed_memory = None):
 
 		self.log = log
 		self.is_server = is_server
 
+		self.shared_memory = shared_memory
+		self.pinned_memory = pinned_memory
+		self.streamed_memory = streamed_memory
+
 		self.callback_client = callback_client
 		self.callback_server = callback_server
+
+		# Ids of registered types, which the server knows about
+		self.definitions_sent = set()
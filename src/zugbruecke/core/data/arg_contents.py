@@ -32,6 +32,7 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import ctypes
+from functools import partial
 from pprint import pformat as pf
 import traceback
 
@@ -54,14 +55,25 @@ from .memory import is_null_pointer
 class arguments_contents_class():
 
 
-	def arg_list_pack(self, args_tuple, argtypes_list):
+	def arg_list_compile(self, argtypes_list):
+
+		# Resolve every argument definition once into specialized routines
+		return {
+			'pack': [(d['n'], self.__compile_pack_item__(d)) for d in argtypes_list],
+			'unpack': [self.__compile_unpack_item__(d) for d in argtypes_list],
+			'sync': [self.__compile_sync_item__(d) for d in argtypes_list],
+			'out': [index for index, d in enumerate(argtypes_list) if self.is_definition_output(d)]
+			}
+
+
+	def arg_list_pack(self, args_tuple, argtypes_plan):
 
 		# Everything is normal
-		if len(args_tuple) == len(argtypes_list):
-			return [(d['n'], self.__pack_item__(a, d)) for a, d in zip(args_tuple, argtypes_list)]
+		if len(args_tuple) == len(argtypes_plan['pack']):
+			return [(n, pack(a)) for a, (n, pack) in zip(args_tuple, argtypes_plan['pack'])]
 
 		# Function has likely not been configured but there are arguments
-		elif len(args_tuple) > 0 and len(argtypes_list) == 0:
+		elif len(args_tuple) > 0 and len(argtypes_plan['pack']) == 0:
 			return list(args_tuple) # let's try ... TODO catch pickling errors
 
 		# Number of arguments is just wrong
@@ -69,14 +81,21 @@ class arguments_contents_class():
 			raise TypeError
 
 
-	def arg_list_unpack(self, args_package_list, argtypes_list):
+	def arg_list_pack_out(self, args_list, argtypes_plan):
+
+		# Only arguments, which may have been changed by the callee, are sent back
+		pack_list = argtypes_plan['pack']
+		return [pack_list[index][1](args_list[index]) for index in argtypes_plan['out']]
+
+
+	def arg_list_unpack(self, args_package_list, argtypes_plan):
 
 		# Everything is normal
-		if len(args_package_list) == len(argtypes_list):
-			return [self.__unpack_item__(a[1], d) for a, d in zip(args_package_list, argtypes_list)]
+		if len(args_package_list) == len(argtypes_plan['unpack']):
+			return [unpack(a[1]) for a, unpack in zip(args_package_list, argtypes_plan['unpack'])]
 
 		# Function has likely not been configured but there are arguments
-		elif len(args_package_list) > 0 and len(argtypes_list) == 0:
+		elif len(args_package_list) > 0 and len(argtypes_plan['unpack']) == 0:
 			return args_package_list
 
 		# Number of arguments is just wrong
@@ -84,38 +103,315 @@ class arguments_contents_class():
 			raise TypeError
 
 
-	def return_msg_pack(self, return_value, returntype_dict):
+	def return_msg_compile(self, returntype_dict):
+
+		unpack = self.__compile_unpack_item__(returntype_dict)
+
+		# The original ctypes strips away ctypes datatypes for fundamental
+		# (non-pointer, non-struct) return values and returns plain Python
+		# data types instead - the unpack result requires stripping
+		if returntype_dict['g'] == GROUP_FUNDAMENTAL and FLAG_POINTER not in returntype_dict['f']:
+			strip = self.__item_value_strip__
+			def unpack_stripped(return_msg):
+				return strip(unpack(return_msg))
+			unpack_return = unpack_stripped
+		# If this is not a fundamental datatype or if there is a pointer involved, just unpack
+		else:
+			unpack_return = unpack
+
+		return {
+			'pack': self.__compile_pack_item__(returntype_dict),
+			'unpack': unpack_return
+			}
+
+
+	def return_msg_pack(self, return_value, returntype_plan):
 
 		if return_value is None:
 			return None
 
-		return self.__pack_item__(return_value, returntype_dict)
+		return returntype_plan['pack'](return_value)
 
 
-	def return_msg_unpack(self, return_msg, returntype_dict):
+	def return_msg_unpack(self, return_msg, returntype_plan):
 
 		if return_msg is None:
 			return None
 
-		# If this is not a fundamental datatype or if there is a pointer involved, just unpack
-		if not returntype_dict['g'] == GROUP_FUNDAMENTAL or FLAG_POINTER in returntype_dict['f']:
-			return self.__unpack_item__(return_msg, returntype_dict)
+		return returntype_plan['unpack'](return_msg)
 
-		# The original ctypes strips away ctypes datatypes for fundamental
-		# (non-pointer, non-struct) return values and returns plain Python
-		# data types instead - the unpack result requires stripping
-		return self.__item_value_strip__(self.__unpack_item__(return_msg, returntype_dict))
 
+	def arg_list_sync_out(self, old_arguments_list, out_package_list, argtypes_plan):
 
-	def arg_list_sync(self, old_arguments_list, new_arguments_list, argtypes_list):
+		# Step through arguments, which have been sent back
+		unpack_list, sync_list = argtypes_plan['unpack'], argtypes_plan['sync']
+		for index, out_package in zip(argtypes_plan['out'], out_package_list):
+			sync_list[index](old_arguments_list[index], unpack_list[index](out_package))
 
-		# Step through arguments
-		for old_arg, new_arg, arg_def_dict in zip(
-			old_arguments_list, new_arguments_list, argtypes_list
-			):
-			self.__sync_item__(
-				old_arg, new_arg, arg_def_dict
-				)
+
+	def __compile_pack_item__(self, arg_def_dict):
+
+		# Both sides agreed on the memory layout, ship raw memory
+		if arg_def_dict.get('b', False):
+			return self.__compile_pack_item_binary__(arg_def_dict)
+
+		# The non-trivial case, involving arrays
+		if not arg_def_dict['s']:
+			return partial(self.__pack_item_array__, arg_def_dict = arg_def_dict)
+
+		# Handle fundamental types
+		if arg_def_dict['g'] == GROUP_FUNDAMENTAL:
+			pack = self.__item_value_strip__
+		# Handle structs
+		elif arg_def_dict['g'] == GROUP_STRUCT:
+			pack = self.__compile_pack_item_struct__(arg_def_dict)
+		# Handle functions
+		elif arg_def_dict['g'] == GROUP_FUNCTION:
+			pack = partial(self.__pack_item_function__, func_def_dict = arg_def_dict)
+		# Handle everything else ... likely pointers handled by memsync
+		else:
+			pack = self.__pack_item_void__
+
+		# Scalars without pointers can be packed directly
+		depth = len(arg_def_dict['f'])
+		if depth == 0:
+			return pack
+
+		strip = self.__item_pointer_strip__
+
+		def pack_pointer(arg_in):
+			# Strip away the pointers ... (all flags are pointers in this case)
+			for _ in range(depth):
+				if is_null_pointer(arg_in):
+					# Just return None - will (hopefully) be overwritten by memsync
+					return None
+				arg_in = strip(arg_in)
+			return pack(arg_in)
+
+		return pack_pointer
+
+
+	def __compile_pack_item_binary__(self, arg_def_dict):
+
+		# Type of memory behind leading pointers and number of pointers
+		datatype = self.get_definition_binary_type(arg_def_dict)
+		depth = len([flag for flag in arg_def_dict['f'] if flag == FLAG_POINTER])
+
+		# Objects of unexpected types are packed the generic way
+		pack_generic = self.__compile_pack_item__(dict(arg_def_dict, b = False))
+		strip = self.__item_pointer_strip__
+
+		def pack_binary(arg_in):
+			arg_stripped = arg_in
+			# Strip away the pointers ...
+			for _ in range(depth):
+				if is_null_pointer(arg_stripped):
+					# Just return None - will (hopefully) be overwritten by memsync
+					return None
+				arg_stripped = strip(arg_stripped)
+			# Raw copy of memory - MUST WORK WITH PICKLE
+			if isinstance(arg_stripped, datatype):
+				return bytes(arg_stripped)
+			return pack_generic(arg_in)
+
+		return pack_binary
+
+
+	def __compile_pack_item_struct__(self, struct_def_dict):
+
+		fields = [
+			(field_def_dict['n'], self.__compile_pack_item__(field_def_dict))
+			for field_def_dict in struct_def_dict['_fields_']
+			]
+
+		def pack_struct(struct_raw):
+			# Return parameter message list - MUST WORK WITH PICKLE
+			return [(name, pack(getattr(struct_raw, name))) for name, pack in fields]
+
+		return pack_struct
+
+
+	def __compile_sync_item__(self, arg_def_dict):
+
+		# Both sides agreed on the memory layout, copy raw memory
+		if arg_def_dict.get('b', False):
+			return self.__compile_sync_item_binary__(arg_def_dict)
+
+		# The non-trivial case, arrays
+		if not arg_def_dict['s']:
+			return partial(self.__sync_item_array__, arg_def_dict = arg_def_dict)
+
+		# Do not do this for void pointers, likely handled by memsync
+		if arg_def_dict['g'] == GROUP_VOID:
+			return self.__sync_item_void__
+
+		if arg_def_dict['g'] == GROUP_FUNDAMENTAL:
+			sync = self.__sync_item_fundamental__
+		elif arg_def_dict['g'] == GROUP_STRUCT:
+			sync = self.__compile_sync_item_struct__(arg_def_dict)
+		else:
+			return self.__sync_item_void__ # DO NOTHING?
+
+		depth = len(arg_def_dict['f'])
+		if depth == 0:
+			return sync
+
+		strip = self.__item_pointer_strip__
+
+		def sync_pointer(old_arg, new_arg):
+			# Strip away the pointers ... (all flags are pointers in this case)
+			for _ in range(depth):
+				old_arg = strip(old_arg)
+				new_arg = strip(new_arg)
+			sync(old_arg, new_arg)
+
+		return sync_pointer
+
+
+	def __compile_sync_item_binary__(self, arg_def_dict):
+
+		# Type of memory behind leading pointers and number of pointers
+		datatype = self.get_definition_binary_type(arg_def_dict)
+		size = ctypes.sizeof(datatype)
+		depth = len([flag for flag in arg_def_dict['f'] if flag == FLAG_POINTER])
+
+		# Objects of unexpected types are synchronized the generic way
+		sync_generic = self.__compile_sync_item__(dict(arg_def_dict, b = False))
+		strip = self.__item_pointer_strip__
+		addressof = ctypes.addressof
+		memmove = ctypes.memmove
+
+		def sync_binary(old_arg, new_arg):
+			old_stripped, new_stripped = old_arg, new_arg
+			# Strip away the pointers ...
+			for _ in range(depth):
+				old_stripped = strip(old_stripped)
+				new_stripped = strip(new_stripped)
+			# Overwrite memory in one go
+			if isinstance(old_stripped, datatype) and isinstance(new_stripped, datatype):
+				memmove(addressof(old_stripped), addressof(new_stripped), size)
+			else:
+				sync_generic(old_arg, new_arg)
+
+		return sync_binary
+
+
+	def __compile_sync_item_struct__(self, struct_def_dict):
+
+		fields = [
+			(field_def_dict['n'], self.__compile_sync_item__(field_def_dict))
+			for field_def_dict in struct_def_dict['_fields_']
+			]
+
+		def sync_struct(old_struct, new_struct):
+			for name, sync in fields:
+				sync(getattr(old_struct, name), getattr(new_struct, name))
+
+		return sync_struct
+
+
+	def __compile_unpack_item__(self, arg_def_dict):
+
+		# Both sides agreed on the memory layout, rebuild from raw memory
+		if arg_def_dict.get('b', False):
+			return self.__compile_unpack_item_binary__(arg_def_dict)
+
+		# And now arrays ...
+		if not arg_def_dict['s']:
+			def unpack_array(arg_raw):
+				return self.__unpack_item_array__(arg_raw, arg_def_dict)[1]
+			return unpack_array
+
+		# Handle fundamental types
+		if arg_def_dict['g'] == GROUP_FUNDAMENTAL:
+			unpack = getattr(ctypes, arg_def_dict['t'], None)
+			# Unknown type name, let the generic routine fail during the call
+			if unpack is None:
+				return partial(self.__unpack_item__, arg_def_dict = arg_def_dict)
+		# Handle structs
+		elif arg_def_dict['g'] == GROUP_STRUCT:
+			unpack = self.__compile_unpack_item_struct__(arg_def_dict)
+		# Handle functions
+		elif arg_def_dict['g'] == GROUP_FUNCTION:
+			unpack = partial(self.__unpack_item_function__, func_def_dict = arg_def_dict)
+		# Handle voids (likely mensync stuff)
+		elif arg_def_dict['g'] == GROUP_VOID:
+			# Return a placeholder
+			return self.__unpack_item_void__
+		# Handle everything else ...
+		else:
+			raise TypeError('unknown argument group %r' % arg_def_dict['g'])
+
+		depth = len(arg_def_dict['f'])
+		if depth == 0:
+			return unpack
+
+		pointer = ctypes.pointer
+
+		def unpack_pointer(arg_raw):
+			arg_rebuilt = unpack(arg_raw)
+			# Step through flags in reverse order (all flags are pointers in this case)
+			for _ in range(depth):
+				arg_rebuilt = pointer(arg_rebuilt)
+			return arg_rebuilt
+
+		return unpack_pointer
+
+
+	def __compile_unpack_item_binary__(self, arg_def_dict):
+
+		# Type of memory behind leading pointers and number of pointers
+		datatype = self.get_definition_binary_type(arg_def_dict)
+		depth = len([flag for flag in arg_def_dict['f'] if flag == FLAG_POINTER])
+
+		# Objects packed the generic way arrive as lists
+		unpack_generic = self.__compile_unpack_item__(dict(arg_def_dict, b = False))
+		from_buffer_copy = datatype.from_buffer_copy
+		pointer = ctypes.pointer
+
+		def unpack_binary(arg_raw):
+			if isinstance(arg_raw, list):
+				return unpack_generic(arg_raw)
+			# Rebuild object from raw memory
+			arg_rebuilt = from_buffer_copy(arg_raw)
+			# Re-create pointers
+			for _ in range(depth):
+				arg_rebuilt = pointer(arg_rebuilt)
+			return arg_rebuilt
+
+		return unpack_binary
+
+
+	def __compile_unpack_item_struct__(self, struct_def_dict):
+
+		struct_type = self.cache_dict['struct_type'][struct_def_dict['t']]
+		fields = [
+			(field_def_dict['n'], self.__compile_unpack_item__(field_def_dict))
+			for field_def_dict in struct_def_dict['_fields_']
+			]
+
+		def unpack_struct(args_list):
+
+			# Generate new instance of struct datatype
+			struct_inst = struct_type()
+
+			# Step through arguments
+			for (name, unpack), field_arg in zip(fields, args_list):
+
+				# HACK is field_arg[1] is None, it's likely a function pointer sent back from Wine side - skip
+				if field_arg[1] is None:
+					continue
+
+				field_value = unpack(field_arg[1])
+
+				try:
+					setattr(struct_inst, name, field_value)
+				except TypeError: # TODO HACK relevant for structs & callbacks & memsync together
+					setattr(struct_inst, name, ctypes.cast(field_value, ctypes.c_void_p))
+
+			return struct_inst
+
+		return unpack_struct
 
 
 	def __item_pointer_strip__(self, arg_in):
@@ -139,6 +435,12 @@ class arguments_contents_class():
 			return arg_in
 
 
+	def __pack_item_void__(self, arg_in):
+
+		# Just return None - will (hopefully) be overwritten by memsync
+		return None
+
+
 	def __pack_item__(self, arg_in, arg_def_dict):
 
 		# Grep the simple case first, scalars
@@ -252,6 +554,19 @@ class arguments_contents_class():
 				)) for field_def_dict in struct_def_dict['_fields_']]
 
 
+	def __sync_item_fundamental__(self, old_arg, new_arg):
+
+		if hasattr(old_arg, 'value'):
+			old_arg.value = new_arg.value
+		else:
+			pass # only relevant within structs or for actual pointers to scalars
+
+
+	def __sync_item_void__(self, old_arg, new_arg):
+
+		pass
+
+
 	def __sync_item__(self, old_arg, new_arg, arg_def_dict):
 
 		# Grep the simple case first, scalars
@@ -337,6 +652,12 @@ class arguments_contents_class():
 				)
 
 
+	def __unpack_item_void__(self, arg_raw):
+
+		# Return a placeholder
+		return None
+
+
 	def __unpack_item__(self, arg_raw, arg_def_dict):
 
 		# Again the simple case first, scalars of any kind
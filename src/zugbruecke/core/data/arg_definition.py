@@ -33,6 +33,7 @@ specific language governing rights and limitations under the License.
 
 import ctypes
 from ctypes import _FUNCFLAG_CDECL
+import hashlib
 #from pprint import pformat as pf
 
 from ..const import (
@@ -44,6 +45,12 @@ from ..const import (
 	GROUP_FUNCTION
 	)
 
+# struct format characters of integer types by size (lower case: signed)
+SCALAR_INT_FORMATS = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}
+
+# Keys of definitions, which describe registered types and are shipped only once
+DEFINITION_BODY_KEYS = ('_fields_', '_argtypes_', '_restype_', '_memsync_', '_flags_', '_factory_type_')
+
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASS: Definition packing and unpacking
@@ -91,6 +98,171 @@ class arguments_definition_class():
 		return self.__pack_definition_dict__(restype)
 
 
+	def pack_definition_message(self, argtypes_d, restype_d, types_list = None):
+
+		# Registered types, which have not been shipped yet, in order of dependencies
+		if types_list is None:
+			types_list = []
+		for datatype_d_dict in argtypes_d + [restype_d]:
+			self.__collect_definitions__(datatype_d_dict, types_list, self.definitions_sent)
+
+		# Registered types are referred to by id
+		return (
+			[self.__strip_definition_dict__(arg_d) for arg_d in argtypes_d],
+			self.__strip_definition_dict__(restype_d),
+			types_list
+			)
+
+
+	def collect_definitions(self, datatype_w_list, types_dict = {}):
+
+		# Registered types referred to by definitions in order of dependencies (unknown ones from types_dict)
+		types_list = []
+		for datatype_w_dict in datatype_w_list:
+			self.__collect_definitions__(datatype_w_dict, types_list, types_dict = types_dict)
+
+		return types_list
+
+
+	def confirm_definition_message(self, types_list):
+
+		# Types are known to the server once it has received a message
+		self.definitions_sent.update(type_id for type_id, _ in types_list)
+
+
+	def register_definitions(self, types_list):
+
+		# Types they depend on come first
+		for type_id, body_w in types_list:
+			if type_id not in self.cache_dict['type_d'].keys():
+				self.cache_dict['type_d'][type_id] = self.__expand_definition_dict__(body_w)
+
+
+	def unpack_definition_message(self, argtypes_w, restype_w, types_list):
+
+		# Register new types
+		self.register_definitions(types_list)
+
+		# Re-attach registered types
+		return (
+			[self.__expand_definition_dict__(arg_w) for arg_w in argtypes_w],
+			self.__expand_definition_dict__(restype_w)
+			)
+
+
+	def apply_definition_layout(self, datatype_d_dict, layout):
+
+		# Raw memory is only transferred if both sides agree on its layout
+		datatype_d_dict['b'] = layout is not None and layout == self.get_definition_layout(datatype_d_dict)
+
+		return datatype_d_dict['b']
+
+
+	def get_definition_binary_type(self, datatype_d_dict):
+
+		# Only fundamental types and structs can be transferred as raw memory
+		if datatype_d_dict['g'] == GROUP_FUNDAMENTAL:
+			# Plain scalars are cheaper to pickle than to rebuild from memory
+			if datatype_d_dict['s']:
+				return None
+			datatype = getattr(ctypes, datatype_d_dict['t'], None)
+		elif datatype_d_dict['g'] == GROUP_STRUCT:
+			datatype = self.cache_dict['struct_type'].get(datatype_d_dict['t'], None)
+		else:
+			return None
+
+		# Unknown type
+		if datatype is None:
+			return None
+
+		# Count leading pointers, which are stripped before transfer
+		flag_list = list(datatype_d_dict['f'])
+		pointer_count = 0
+		while pointer_count < len(flag_list) and flag_list[pointer_count] == FLAG_POINTER:
+			pointer_count += 1
+
+		# Pointers within arrays point to memory which can not be transferred
+		if FLAG_POINTER in flag_list[pointer_count:]:
+			return None
+
+		# Re-create arrays
+		for flag in reversed(flag_list[pointer_count:]):
+			datatype = datatype * flag
+
+		return datatype
+
+
+	def apply_paramflags_to_argtypes_definition(self, argtypes_d, paramflags):
+
+		# Without paramflags, classify arguments by their definitions
+		if paramflags is None:
+			for arg_d in argtypes_d:
+				arg_d['o'] = self.is_definition_output(arg_d)
+			return
+
+		if len(paramflags) != len(argtypes_d):
+			raise ValueError('paramflags must have one entry per argument')
+
+		# Output flag (2, like in ctypes) marks arguments, which are synced back
+		for arg_d, flag in zip(argtypes_d, paramflags):
+			if isinstance(flag, tuple):
+				flag = flag[0]
+			arg_d['o'] = bool(flag & 2)
+
+
+	def is_definition_output(self, datatype_d_dict):
+
+		# Explicitly classified by paramflags
+		if 'o' in datatype_d_dict.keys():
+			return datatype_d_dict['o']
+
+		# memsync pointers and functions are not synced back
+		if datatype_d_dict['g'] in (GROUP_VOID, GROUP_FUNCTION):
+			return False
+
+		# Memory behind pointers and arrays (passed as pointers) may be changed by callee
+		if len(datatype_d_dict['f']) > 0:
+			return True
+
+		# Structs passed by value only if their fields hold pointers
+		if datatype_d_dict['g'] == GROUP_STRUCT:
+			return any(
+				field['g'] == GROUP_STRUCT and self.is_definition_output(field) or field['p']
+				for field in datatype_d_dict['_fields_']
+				)
+
+		# Scalars passed by value
+		return False
+
+
+	def get_definition_scalar_format(self, argtypes_d, restype_d):
+
+		# Return value must be a plain scalar or nothing
+		if not (restype_d['g'] == GROUP_VOID and restype_d['t'] is None and len(restype_d['f']) == 0):
+			if self.__get_scalar_format__(restype_d) is None:
+				return None
+
+		# Arguments must be plain scalars, passed by value
+		arg_formats = [self.__get_scalar_format__(arg_d) for arg_d in argtypes_d]
+		if None in arg_formats:
+			return None
+
+		# Standard sizes, no padding - identical on both sides
+		return '<' + ''.join(arg_formats)
+
+
+	def get_definition_layout(self, datatype_d_dict):
+
+		# Get type of memory behind leading pointers
+		datatype = self.get_definition_binary_type(datatype_d_dict)
+
+		# No candidate for raw memory transfers
+		if datatype is None:
+			return None
+
+		return self.__get_layout_of_type__(datatype)
+
+
 	def unpack_definition_argtypes(self, argtypes_d):
 
 		return [self.__unpack_definition_dict__(arg_d_dict) for arg_d_dict in argtypes_d]
@@ -101,6 +273,37 @@ class arguments_definition_class():
 		return self.__unpack_definition_dict__(restype_d)
 
 
+	def __collect_definitions__(self, datatype_d_dict, types_list, known = (), types_dict = {}):
+
+		# Registered type, which is not known yet
+		type_id = datatype_d_dict.get('i', None)
+		if type_id is not None:
+			if type_id in known or type_id in (item[0] for item in types_list):
+				return
+			datatype_d_dict = self.cache_dict['type_w'].get(type_id, None) or types_dict[type_id]
+
+		# Types within fields, arguments and return values come first
+		for child_d_dict in datatype_d_dict.get('_fields_', []) + datatype_d_dict.get('_argtypes_', []):
+			self.__collect_definitions__(child_d_dict, types_list, known, types_dict)
+		if '_restype_' in datatype_d_dict.keys():
+			self.__collect_definitions__(datatype_d_dict['_restype_'], types_list, known, types_dict)
+
+		if type_id is not None:
+			types_list.append((type_id, datatype_d_dict))
+
+
+	def __expand_definition_dict__(self, datatype_w_dict):
+
+		# Attach body of registered type
+		if 'i' in datatype_w_dict.keys():
+			datatype_d_dict = datatype_w_dict.copy()
+			datatype_d_dict.update(self.cache_dict['type_d'][datatype_w_dict['i']])
+			return datatype_d_dict
+
+		# Expand fields, arguments and return values
+		return self.__map_definition_dict__(datatype_w_dict, self.__expand_definition_dict__)
+
+
 	def __generate_struct_from_definition__(self, struct_d_dict):
 
 		# Prepare fields
@@ -162,6 +365,104 @@ class arguments_definition_class():
 			)
 
 
+	def __get_scalar_format__(self, datatype_d_dict):
+
+		# Only fundamental types passed by value
+		if datatype_d_dict['g'] != GROUP_FUNDAMENTAL or len(datatype_d_dict['f']) != 0:
+			return None
+		datatype = getattr(ctypes, datatype_d_dict['t'], None)
+		if datatype is None:
+			return None
+
+		# Type code and size of type on this side
+		code, size = datatype._type_, ctypes.sizeof(datatype)
+		if code in 'bhilq' and size in SCALAR_INT_FORMATS.keys():
+			return SCALAR_INT_FORMATS[size]
+		elif code in 'BHILQ' and size in SCALAR_INT_FORMATS.keys():
+			return SCALAR_INT_FORMATS[size].upper()
+		elif code in 'fd?':
+			return code
+		elif code == 'g' and size == 8: # long double is a double on Windows
+			return 'd'
+
+		# Pointer-like types, characters, ...
+		return None
+
+
+	def __get_layout_of_type__(self, datatype):
+
+		# Get group of datatype
+		group_name = type(datatype).__name__
+
+		# Arrays: Length and layout of elements
+		if group_name == 'PyCArrayType':
+
+			element_layout = self.__get_layout_of_type__(datatype._type_)
+			if element_layout is None:
+				return None
+
+			return ('a', datatype._length_, element_layout)
+
+		# Structs: Size and name, offset, size and layout of every field
+		elif group_name == 'PyCStructType':
+
+			field_layouts = []
+			for field in datatype._fields_:
+				field_layout = self.__get_layout_of_type__(field[1])
+				if field_layout is None:
+					return None
+				field_descriptor = getattr(datatype, field[0])
+				field_layouts.append((
+					field[0], field_descriptor.offset, field_descriptor.size, field_layout
+					))
+
+			return ('s', ctypes.sizeof(datatype), tuple(field_layouts))
+
+		# Fundamental types: Type code and size
+		elif group_name == 'PyCSimpleType':
+
+			# Pointer-like types (strings, void pointers, objects) reference foreign memory
+			if datatype._type_ in 'zZPOX':
+				return None
+
+			return ('f', datatype._type_, ctypes.sizeof(datatype))
+
+		# Pointers, functions, unions ...
+		else:
+
+			return None
+
+
+	def __get_definition_id__(self, body_w):
+
+		# Same description, same id - across processes and runs
+		return hashlib.sha1(repr(self.__get_definition_key__(body_w)).encode('utf-8')).hexdigest()[:16]
+
+
+	def __get_definition_key__(self, item):
+
+		# Turn dicts (no stable order) and lists into nested sorted tuples
+		if isinstance(item, dict):
+			return tuple(sorted((key, self.__get_definition_key__(value)) for key, value in item.items()))
+		elif isinstance(item, (list, tuple)):
+			return tuple(self.__get_definition_key__(value) for value in item)
+		return item
+
+
+	def __map_definition_dict__(self, datatype_d_dict, func):
+
+		# Copy of definition with func applied to fields, arguments and return value
+		datatype_m_dict = datatype_d_dict.copy()
+		if '_fields_' in datatype_m_dict.keys():
+			datatype_m_dict['_fields_'] = [func(field) for field in datatype_m_dict['_fields_']]
+		if '_argtypes_' in datatype_m_dict.keys():
+			datatype_m_dict['_argtypes_'] = [func(arg) for arg in datatype_m_dict['_argtypes_']]
+		if '_restype_' in datatype_m_dict.keys():
+			datatype_m_dict['_restype_'] = func(datatype_m_dict['_restype_'])
+
+		return datatype_m_dict
+
+
 	def __pack_definition_dict__(self, datatype, field_name = None):
 
 		# Not all datatypes have a name, let's handle that
@@ -233,7 +534,8 @@ class arguments_definition_class():
 			if type_name not in self.cache_dict['struct_type'].keys():
 				self.cache_dict['struct_type'][type_name] = datatype
 
-			# TODO: For speed, cache packed struct definitions for known structs
+			# Fields are described once per struct type and shared
+			type_id = self.__register_definition__(datatype, group_name)
 
 			return {
 				'f': flag_list,
@@ -243,29 +545,28 @@ class arguments_definition_class():
 				'n': field_name, # kw
 				't': type_name, # Type name, such as 'c_int'
 				'g': GROUP_STRUCT,
-				'_fields_': [
-					self.__pack_definition_dict__(field[1], field[0]) for field in datatype._fields_
-					]
+				'i': type_id, # Registered type
+				'_fields_': self.cache_dict['type_d'][type_id]['_fields_']
 				}
 
 		# Function pointers
 		elif group_name == 'PyCFuncPtrType':
 
-			# TODO: For speed, cache packed function definitions for known functions
+			# Prototype is described once per function type and shared
+			type_id = self.__register_definition__(datatype, group_name)
 
-			return {
+			datatype_d_dict = {
 				'f': flag_list,
 				's': flag_scalar,
 				'd': flag_array_depth,
 				'p': flag_pointer,
 				'n': field_name, # kw
-				't': (datatype._restype_, datatype._argtypes_, datatype._flags_).__hash__(),
+				't': type_id,
 				'g': GROUP_FUNCTION,
-				'_argtypes_': self.pack_definition_argtypes(datatype._argtypes_),
-				'_restype_': self.pack_definition_returntype(datatype._restype_),
-				'_memsync_': self.pack_definition_memsync(datatype.memsync),
-				'_flags_': datatype._flags_
+				'i': type_id # Registered type
 				}
+			datatype_d_dict.update(self.cache_dict['type_d'][type_id])
+			return datatype_d_dict
 
 		# UNKNOWN stuff, likely pointers - handled without datatype
 		else:
@@ -281,6 +582,59 @@ class arguments_definition_class():
 				}
 
 
+	def __register_definition__(self, datatype, group_name):
+
+		# Has type been described before?
+		if datatype in self.cache_dict['type_id'].keys():
+			return self.cache_dict['type_id'][datatype]
+
+		# Describe fields of structs
+		if group_name == 'PyCStructType':
+			body_d = {
+				't': datatype.__name__,
+				'g': GROUP_STRUCT,
+				'_fields_': [
+					self.__pack_definition_dict__(field[1], field[0]) for field in datatype._fields_
+					]
+				}
+
+		# Describe prototypes of function pointers
+		else:
+			body_d = {
+				'_argtypes_': self.pack_definition_argtypes(datatype._argtypes_),
+				'_restype_': self.pack_definition_returntype(datatype._restype_),
+				'_memsync_': self.pack_definition_memsync(datatype.memsync),
+				'_flags_': datatype._flags_
+				}
+
+		# Nested registered types are referred to by id, content of body makes id
+		body_w = self.__map_definition_dict__(body_d, self.__strip_definition_dict__)
+		if '_memsync_' in body_w.keys():
+			# memsync definitions of generated types are compiled, ship a pristine copy
+			body_w['_memsync_'] = self.pack_definition_memsync(datatype.memsync)
+		type_id = self.__get_definition_id__(body_w)
+
+		# Store description for client and for shipping
+		self.cache_dict['type_d'][type_id] = body_d
+		self.cache_dict['type_w'][type_id] = body_w
+		self.cache_dict['type_id'][datatype] = type_id
+
+		return type_id
+
+
+	def __strip_definition_dict__(self, datatype_d_dict):
+
+		# Registered types are referred to by id only
+		if 'i' in datatype_d_dict.keys():
+			return {
+				key: value for key, value in datatype_d_dict.items()
+				if key not in DEFINITION_BODY_KEYS
+				}
+
+		# Strip fields, arguments and return values
+		return self.__map_definition_dict__(datatype_d_dict, self.__strip_definition_dict__)
+
+
 	def __unpack_definition_dict__(self, datatype_d_dict):
 
 		# Handle fundamental C datatypes (PyCSimpleType)
@@ -32,19 +32,24 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import ctypes
+import operator
 from pprint import pformat as pf
 #import traceback
 
 from ..const import GROUP_VOID
 from .memory import (
+	diff_bytes_into_runs,
 	generate_pointer_from_bytes,
 	is_null_pointer,
 	overwrite_pointer_with_bytes,
-	serialize_pointer_into_bytes
+	serialize_pointer_into_buffer
 	)
 
 WCHAR_BYTES = ctypes.sizeof(ctypes.c_wchar)
 
+# Codecs of wchar_t by its size: Windows uses UTF-16, unixlike systems UTF-32
+WCHAR_CODECS = {2: 'utf-16-le', 4: 'utf-32-le'}
+
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASS: Memory content packing and unpacking
@@ -58,8 +63,8 @@ class memory_contents_class():
 		# Iterate over memory segments, which must be kept in sync
 		for memsync_d in memsync_d_list:
 
-			# Get type of pointer argument
-			arg_type = self.__get_argument_type_by_memsync_path__(memsync_d['p'], argtypes_d, restype_d)
+			# Get type of pointer argument (registered struct types are shared, so copy along the path)
+			arg_type = self.__get_argument_type_by_memsync_path__(memsync_d['p'], argtypes_d, restype_d, copy = True)
 
 			# HACK make memory sync pointers type agnostic
 			arg_type['g'] = GROUP_VOID
@@ -69,7 +74,21 @@ class memory_contents_class():
 	def client_pack_memory_list(self, args_tuple, memsync_d_list):
 
 		# Pack data for every pointer, append data to package
-		return [self.__pack_memory_item__(memsync_d, args_tuple) for memsync_d in memsync_d_list]
+		return [self.__pack_memory_item__(memsync_d, args_tuple, shared = True) for memsync_d in memsync_d_list]
+
+
+	def client_release_memory_list(self, mem_package_list):
+
+		# Iterate over memory package dicts of a call, which was unpacked or will not be unpacked
+		for memory_d in mem_package_list:
+
+			# Hand back shared memory segment
+			if memory_d['m'] is not None:
+				self.shared_memory.release(self.shared_memory.open(memory_d['m']))
+
+			# Drop stream, which was not read (e.g. call failed)
+			if memory_d['s'] is not None:
+				self.streamed_memory.drop(memory_d['s'][0])
 
 
 	def client_unpack_memory_list(self, args_list, return_value, mem_package_list, memsync_d_list):
@@ -100,13 +119,51 @@ class memory_contents_class():
 
 				memory_d.update(self.__pack_memory_item__(memsync_d, args_list, return_value))
 
+			# If pointer pointed to shared memory or a pinned buffer, there is nothing to copy
+			elif memory_d['m'] is not None or memory_d['k'] is not None:
+
+				continue
+
+			# If pointer pointed to memory, which is only read by the routine, nothing has changed
+			elif memsync_d['d'] == 'in':
+
+				memory_d['d'] = b''
+				memory_d['r'] = []
+
 			# If pointer pointed to data on client side
 			else:
 
-				# Overwrite old data in package with new data from memory
-				memory_d['d'] = serialize_pointer_into_bytes(
-					ctypes.c_void_p(memory_d['a']), memory_d['l']
+				# Memory received as bytearray is used in place, i.e. it already holds the new data
+				is_in_place = isinstance(memory_d['d'], bytearray) and not memsync_d['x']
+
+				# Very large sections, which are still in place, are streamed back in chunks
+				is_streamed = (
+					is_in_place and not memsync_d['w']
+					and self.streamed_memory is not None and self.streamed_memory.accepts(memory_d['l'])
 					)
+				if is_streamed:
+					memory_d['s'] = self.streamed_memory.offer(memory_d['a'], memory_d['l'], keep = memory_d['d'])
+					memory_d['d'] = b''
+					continue
+
+				# Get new data from memory
+				if is_in_place:
+					data = memory_d['d']
+				else:
+					data = serialize_pointer_into_buffer(
+						ctypes.c_void_p(memory_d['a']), memory_d['l']
+						)
+
+				# Send only changed ranges if requested (not for converted wchars) and if they are small enough
+				if memsync_d['x'] and memsync_d['d'] == 'inout' and not memsync_d['w']:
+					runs = diff_bytes_into_runs(memory_d['d'], data)
+					if 2 * sum(len(run) for _, run in runs) <= len(data):
+						memory_d['d'] = b''
+						memory_d['r'] = runs
+						continue
+
+				# Overwrite old data in package with new data from memory
+				memory_d['d'] = data
 
 
 	def server_unpack_memory_list(self, args_tuple, arg_memory_list, memsync_d_list):
@@ -120,36 +177,90 @@ class memory_contents_class():
 				# Insert new NULL pointer
 				self.__unpack_memory_item_null__(memory_d, memsync_d, args_tuple)
 
+			# Is this memory, which is only written by the routine?
+			elif memsync_d['d'] == 'out' and memory_d['m'] is None and memory_d['k'] is None:
+
+				# Contents were not sent, memory starts zeroed
+				memory_d['d'] = bytearray(memory_d['l'])
+				self.__unpack_memory_item_data__(memory_d, memsync_d, args_tuple)
+
+				# Zeroed memory is not sent back if the call fails
+				memory_d['d'] = b''
+
 			else:
 
 				# Unpack one memory section / item
 				self.__unpack_memory_item_data__(memory_d, memsync_d, args_tuple)
 
 
-	def __adjust_wchar_length__(self, memory_d):
+	def __adjust_wchar_length__(self, memory_d, length = None):
 
 		old_len = memory_d['w']
 		new_len = WCHAR_BYTES
 
-		if old_len == new_len:
+		# Nothing to convert or fit
+		if len(memory_d['d']) == 0:
+			memory_d['w'] = WCHAR_BYTES
 			return
 
-		tmp = bytearray(memory_d['l'] * new_len // old_len)
+		data = memory_d['d']
+
+		# Transcode, surrogate pairs become single characters and vice versa, lone surrogates survive
+		if old_len != new_len:
+			try:
+				text = bytes(data).decode(WCHAR_CODECS[old_len], 'surrogatepass')
+			except UnicodeDecodeError: # Not a valid code point, e.g. beyond U+10FFFF
+				text = bytes(data).decode(WCHAR_CODECS[old_len], 'replace')
+			data = text.encode(WCHAR_CODECS[new_len], 'surrogatepass')
+
+		# Fit into given length in bytes, i.e. clip or pad with NUL wchars
+		if length is not None:
+			if len(data) > length:
+				data = data[:length]
+			elif len(data) < length:
+				data = bytes(data) + bytes(length - len(data))
+
+		memory_d['d'] = data
+		memory_d['l'] = len(data)
+		memory_d['w'] = WCHAR_BYTES
+
 
-		for index in range(old_len if new_len > old_len else new_len):
-			tmp[index::new_len] = memory_d['d'][index::old_len]
+	def __compile_memsync_length__(self, memsync_d):
 
-		memory_d['d'] = bytes(tmp)
-		memory_d['l'] = len(memory_d['d'])
-		memory_d['w'] = WCHAR_BYTES
+		# There is no function defining the length?
+		if '_f' not in memsync_d.keys():
+
+			# Accessor for length
+			get_length = self.__compile_memsync_path__(memsync_d['l'])
+
+			def get_number_of_elements(args_tuple, return_value = None):
+				length = get_length(args_tuple, return_value)
+				# Length might come from ctypes or a Python datatype
+				return getattr(length, 'value', length)
+
+			return get_number_of_elements
+
+		# Make sure length can be computed from a tuple of arguments
+		assert isinstance(memsync_d['l'], tuple)
+
+		# Accessors for arguments of length function
+		length_function = memsync_d['_f']
+		get_items = tuple(self.__compile_memsync_path__(item) for item in memsync_d['l'])
 
+		def get_number_of_elements(args_tuple, return_value = None):
+			# Compute length from arguments and return
+			return length_function(*[get_item(args_tuple, return_value) for get_item in get_items])
 
-	def __get_argument_by_memsync_path__(self, memsync_path, args_tuple, return_value = None):
+		return get_number_of_elements
 
-		# Reference args_tuple as initial value
-		element = args_tuple
 
-		# Step through path
+	def __compile_memsync_path__(self, memsync_path):
+
+		# Steps of path, each one turns an element into the next one
+		steps = []
+		from_return_value = False
+
+		# Translate path once
 		for element_index, path_element in enumerate(memsync_path):
 
 			# Element is an int
@@ -157,11 +268,11 @@ class memory_contents_class():
 
 				# Pointer to pointer (in top-level arguments) for memory allocation by DLL
 				if path_element < 0:
-					element = self.__item_pointer_strip__(element)
+					steps.append(self.__item_pointer_strip__)
 
 				# Dive into argument tuple
 				else:
-					element = element[path_element]
+					steps.append(operator.itemgetter(path_element))
 
 			# Element equals 'r' and index 0: Return value
 			elif isinstance(path_element, str) and element_index == 0:
@@ -169,15 +280,12 @@ class memory_contents_class():
 				if path_element != 'r':
 					raise ValueError()
 
-				element = return_value
-
-				if element is None:
-					return None
+				from_return_value = True
 
 			# Field name in struct
 			elif isinstance(path_element, str) and element_index > 0:
 
-				element = getattr(self.__item_pointer_strip__(element), path_element)
+				steps.append(self.__compile_memsync_field_step__(path_element))
 
 			# TODO elements of arrays
 			else:
@@ -185,10 +293,40 @@ class memory_contents_class():
 				print(path_element)
 				raise # TODO
 
-		return element
+		steps = tuple(steps)
 
+		# Accessor, which starts at return value
+		if from_return_value:
 
-	def __get_argument_type_by_memsync_path__(self, memsync_path, argtypes_d, restype_d):
+			def get_argument(args_tuple, return_value = None):
+				element = return_value
+				if element is None:
+					return None
+				for step in steps:
+					element = step(element)
+				return element
+
+		# Accessor, which starts at arguments
+		else:
+
+			def get_argument(args_tuple, return_value = None):
+				element = args_tuple
+				for step in steps:
+					element = step(element)
+				return element
+
+		return get_argument
+
+
+	def __compile_memsync_field_step__(self, field_name):
+
+		item_pointer_strip = self.__item_pointer_strip__
+		get_field = operator.attrgetter(field_name)
+
+		return lambda element: get_field(item_pointer_strip(element))
+
+
+	def __get_argument_type_by_memsync_path__(self, memsync_path, argtypes_d, restype_d, copy = False):
 
 		# Is path targetting an argument or the return value?
 		if isinstance(memsync_path[0], int):
@@ -204,8 +342,16 @@ class memory_contents_class():
 			if isinstance(path_element, int):
 				if path_element < 0:
 					continue
+			# Modified copies are no longer the registered type
+			if copy:
+				arg_type.pop('i', None)
+				arg_type['_fields_'] = [field.copy() for field in arg_type['_fields_']]
 			# Go deeper ...
-			arg_type = {field['n']: field for field in arg_type['_fields_']}[path_element]
+			arg_type = next(field for field in arg_type['_fields_'] if field['n'] == path_element)
+
+		# Modified copies are no longer the registered type
+		if copy:
+			arg_type.pop('i', None)
 
 		return arg_type
 
@@ -222,30 +368,10 @@ class memory_contents_class():
 		return len(ctypes.cast(in_pointer, datatype_p).value) * ctypes.sizeof(datatype)
 
 
-	def __get_number_of_elements__(self, memsync_d, args_tuple, return_value = None):
-
-		# There is no function defining the length?
-		if '_f' not in memsync_d.keys():
-
-			# Search for length
-			length = self.__get_argument_by_memsync_path__(memsync_d['l'], args_tuple, return_value)
-
-			# Length might come from ctypes or a Python datatype
-			return getattr(length, 'value', length)
-
-		# Make sure length can be computed from a tuple of arguments
-		assert isinstance(memsync_d['l'], tuple)
-
-		# Compute length from arguments and return
-		return memsync_d['_f'](*(
-			self.__get_argument_by_memsync_path__(item, args_tuple, return_value) for item in memsync_d['l']
-			))
-
-
-	def __pack_memory_item__(self, memsync_d, args_tuple, return_value = None):
+	def __pack_memory_item__(self, memsync_d, args_tuple, return_value = None, shared = False):
 
 		# Search for pointer
-		pointer = self.__get_argument_by_memsync_path__(memsync_d['p'], args_tuple, return_value)
+		pointer = memsync_d['_p'](args_tuple, return_value)
 
 		# Convert argument into ctypes datatype TODO more checks needed!
 		if '_c' in memsync_d.keys():
@@ -259,9 +385,14 @@ class memory_contents_class():
 			return {
 				'd': b'',
 				'l': 0,
+				'o': 0,
 				'a': None,
 				'_a': None,
-				'w': w
+				'w': w,
+				'm': None,
+				'r': None,
+				'k': None,
+				's': None
 				}
 
 		if memsync_d['n']:
@@ -269,14 +400,75 @@ class memory_contents_class():
 			length = self.__get_length_of_null_terminated_string__(pointer, bool(w))
 		else:
 			# Compute actual length
-			length = self.__get_number_of_elements__(memsync_d, args_tuple, return_value) * memsync_d['s']
+			length = memsync_d['_l'](args_tuple, return_value) * memsync_d['s']
+
+		# Local pointer address as integer
+		address = ctypes.cast(pointer, ctypes.c_void_p).value
+
+		# Memory within a pinned buffer (no wchar conversion) is mirrored on the other side, only its id is shipped
+		pin = None
+		if shared and w is None and self.pinned_memory is not None:
+			pin = self.pinned_memory.client_find(address, length)
+		if pin is not None:
+			return {
+				'd': b'', # no serialized data
+				'l': length, # length of data in pinned buffer
+				'o': length, # original length of local memory
+				'a': address, # local pointer address as integer
+				'_a': None, # remote pointer has not been initialized
+				'w': w, # local length of Unicode wchar if required
+				'm': None, # no shared memory segment
+				'r': None, # no changed ranges
+				'k': pin, # id of pinned buffer and offset
+				's': None # not streamed
+				}
+
+		# Large buffers (no wchar conversion) are copied into shared memory, only a handle is shipped
+		if shared and w is None and self.shared_memory is not None and self.shared_memory.accepts(length):
+			segment = self.shared_memory.acquire(length)
+			# Memory, which is only written by the routine, starts zeroed
+			if memsync_d['d'] == 'out':
+				ctypes.memset(segment['a'], 0, length)
+			else:
+				ctypes.memmove(segment['a'], address, length)
+			return {
+				'd': b'', # no serialized data
+				'l': length, # length of data in shared memory
+				'o': length, # original length of local memory
+				'a': address, # local pointer address as integer
+				'_a': None, # remote pointer has not been initialized
+				'w': w, # local length of Unicode wchar if required
+				'm': segment['h'], # handle of shared memory segment
+				'r': None, # no changed ranges
+				'k': None, # no pinned buffer
+				's': None # not streamed
+				}
+
+		# Not streamed by default
+		stream = None
+
+		# On client side, contents of memory, which is only written by the routine, are not sent
+		if shared and memsync_d['d'] == 'out':
+			data = b''
+		# Very large sections (no wchar conversion) are streamed, the other side reads them in chunks
+		elif w is None and self.streamed_memory is not None and self.streamed_memory.accepts(length):
+			data = b''
+			stream = self.streamed_memory.offer(address, length, keep = pointer)
+		# On client side, large sections of the caller's (not converted) memory are sent without copy
+		else:
+			data = serialize_pointer_into_buffer(pointer, length, copy = not shared or '_c' in memsync_d.keys())
 
 		return {
-			'd': serialize_pointer_into_bytes(pointer, length), # serialized data, '' if NULL pointer
+			'd': data, # serialized data, '' if NULL pointer
 			'l': length, # length of serialized data
-			'a': ctypes.cast(pointer, ctypes.c_void_p).value, # local pointer address as integer
+			'o': length, # original length of local memory
+			'a': address, # local pointer address as integer
 			'_a': None, # remote pointer has not been initialized
-			'w': w # local length of Unicode wchar if required
+			'w': w, # local length of Unicode wchar if required
+			'm': None, # no shared memory segment
+			'r': None, # no changed ranges
+			'k': None, # no pinned buffer
+			's': stream # handle of stream if streamed
 			}
 
 
@@ -294,14 +486,30 @@ class memory_contents_class():
 		self.__swap_memory_addresses__(memory_d)
 
 		# Search for pointer in passed arguments
-		pointer_arg = self.__get_argument_by_memsync_path__(memsync_d['p'][:-1], args_tuple, return_value)
+		pointer_arg = memsync_d['_pp'](args_tuple, return_value)
 
-		# Adjust Unicode wchar length
-		if memsync_d['w']:
-			self.__adjust_wchar_length__(memory_d)
+		# Streamed data is read in chunks into fresh memory
+		if memory_d['s'] is not None:
+			memory_d['d'] = bytearray(memory_d['l'])
+			self.streamed_memory.receive(
+				memory_d['s'], generate_pointer_from_bytes(memory_d['d']).value, memory_d['l']
+				)
+			memory_d['s'] = None
 
-		# Generate pointer to passed data
-		pointer = generate_pointer_from_bytes(memory_d['d'])
+		# Adjust Unicode wchar length, fixed-size buffers keep their number of wchars
+		if memsync_d['w']:
+			self.__adjust_wchar_length__(
+				memory_d, length = None if memsync_d['n'] else memory_d['o'] // memory_d['w'] * WCHAR_BYTES
+				)
+
+		# Generate pointer to passed data, either in shared memory, in a pinned buffer's mirror or in a fresh copy
+		if memory_d['m'] is not None:
+			pointer = ctypes.c_void_p(self.shared_memory.open(memory_d['m'])['a'])
+		elif memory_d['k'] is not None:
+			pointer = ctypes.c_void_p(self.pinned_memory.server_address(*memory_d['k']))
+		else:
+			# Received data is kept unchanged if changed ranges are looked for later
+			pointer = generate_pointer_from_bytes(memory_d['d'], copy = memsync_d['x'])
 
 		# Is this an already existing pointer, which has to be given a new value?
 		if hasattr(pointer_arg, 'contents'):
@@ -351,12 +559,13 @@ class memory_contents_class():
 		if memsync_d['p'][-1] == -1:
 			pointer = ctypes.pointer(ctypes.c_void_p())
 			path_shift = 1 # cut off 1 element from path
+			# Search for pointer in passed arguments
+			pointer_arg = memsync_d['_ppp'](args_tuple)
 		else:
 			pointer = ctypes.c_void_p()
 			path_shift = 0
-
-		# Search for pointer in passed arguments
-		pointer_arg = self.__get_argument_by_memsync_path__(memsync_d['p'][:(-1 - path_shift)], args_tuple)
+			# Search for pointer in passed arguments
+			pointer_arg = memsync_d['_pp'](args_tuple)
 
 		# If we're in the top level arguments or an array ...
 		if isinstance(memsync_d['p'][-1 - path_shift], int):
@@ -373,9 +582,30 @@ class memory_contents_class():
 		# Swap local and remote memory addresses
 		self.__swap_memory_addresses__(memory_d)
 
-		# Adjust Unicode wchar length
+		# Adjust Unicode wchar length, never write beyond the original memory
 		if memsync_d['w']:
-			self.__adjust_wchar_length__(memory_d)
+			self.__adjust_wchar_length__(memory_d, length = memory_d['o'])
+
+		# Pinned buffers are synced on demand
+		if memory_d['k'] is not None:
+			return
+
+		# Copy data back from shared memory (unless only read by the routine), segment is released by caller
+		if memory_d['m'] is not None:
+			if memsync_d['d'] != 'in':
+				ctypes.memmove(memory_d['a'], self.shared_memory.open(memory_d['m'])['a'], memory_d['l'])
+			return
+
+		# Read streamed data in chunks straight into the local memory
+		if memory_d['s'] is not None:
+			self.streamed_memory.receive(memory_d['s'], memory_d['a'], memory_d['l'])
+			return
+
+		# Overwrite changed ranges only
+		if memory_d['r'] is not None:
+			for offset, data in memory_d['r']:
+				overwrite_pointer_with_bytes(ctypes.c_void_p(memory_d['a'] + offset), data)
+			return
 
 		# Overwrite the local pointers with new data
 		overwrite_pointer_with_bytes(
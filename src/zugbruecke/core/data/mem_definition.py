@@ -35,6 +35,8 @@ import ctypes
 from pprint import pformat as pf
 #import traceback
 
+from ..const import MEMSYNC_DIRECTIONS
+
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASS: Memory content packing and unpacking
@@ -61,6 +63,9 @@ class memory_definition_class():
 
 	def __unpack_memsync_definition_dict__(self, memsync_d):
 
+		# Compile into a copy, the definition may be shared (e.g. by sessions of a sharded session)
+		memsync_d = memsync_d.copy()
+
 		# Null-terminated string - off by default
 		if 'n' not in memsync_d.keys():
 			memsync_d['n'] = False
@@ -85,4 +90,23 @@ class memory_definition_class():
 		if 'w' not in memsync_d.keys():
 			memsync_d['w'] = False
 
+		# Direction of memory - read and written by default
+		if 'd' not in memsync_d.keys():
+			memsync_d['d'] = 'inout'
+		if memsync_d['d'] not in MEMSYNC_DIRECTIONS:
+			raise ValueError('memsync direction must be one of %s' % ', '.join(MEMSYNC_DIRECTIONS))
+
+		# Send back changed ranges only - off by default
+		if 'x' not in memsync_d.keys():
+			memsync_d['x'] = False
+
+		# Compile accessors for pointer, its parent and its grandparent
+		memsync_d['_p'] = self.__compile_memsync_path__(memsync_d['p'])
+		memsync_d['_pp'] = self.__compile_memsync_path__(memsync_d['p'][:-1])
+		memsync_d['_ppp'] = self.__compile_memsync_path__(memsync_d['p'][:-2])
+
+		# Compile accessor for number of elements
+		if 'l' in memsync_d.keys():
+			memsync_d['_l'] = self.__compile_memsync_length__(memsync_d)
+
 		return memsync_d
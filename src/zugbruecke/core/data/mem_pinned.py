@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	src/zugbruecke/core/data/mem_pinned.py: Buffers mirrored on the other side across calls
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import ctypes
+import threading
+
+from .memory import (
+	generate_pointer_from_bytes,
+	overwrite_pointer_with_bytes,
+	serialize_pointer_into_buffer
+	)
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS: Pinned memory
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class pinned_memory_class():
+
+
+	def __init__(self, shared_memory):
+
+		# Mirrors are placed in shared memory if it accepts them
+		self.shared_memory = shared_memory
+
+		# Buffers are pinned and looked up from different threads
+		self.__lock__ = threading.Lock()
+
+		# Counter for unique buffer ids
+		self.__counter__ = 0
+
+		# Pinned buffers by id (side of caller)
+		self.__buffers__ = {}
+
+		# Mirrors of pinned buffers by id (side of routine)
+		self.__mirrors__ = {}
+
+
+	def client_find(self, address, length):
+
+		with self.__lock__:
+
+			# Look for pinned buffer containing the memory section
+			for buffer in self.__buffers__.values():
+				if buffer.address <= address and address + length <= buffer.address + buffer.length:
+					return buffer.id, address - buffer.address
+
+		return None
+
+
+	def client_pin(self, rpc_client, buffer):
+
+		with self.__lock__:
+			pin_id = self.__counter__
+			self.__counter__ += 1
+
+		pinned_buffer = pinned_buffer_class(self, rpc_client, pin_id, buffer)
+
+		with self.__lock__:
+			self.__buffers__[pin_id] = pinned_buffer
+
+		return pinned_buffer
+
+
+	def client_unpin(self, pin_id):
+
+		with self.__lock__:
+			self.__buffers__.pop(pin_id)
+
+
+	def server_address(self, pin_id, offset):
+
+		return self.__mirrors__[pin_id]['a'] + offset
+
+
+	def server_pin(self, pin_id, length, data, handle):
+		"""
+		Exposed interface
+		"""
+
+		# Mirror lives in shared memory segment offered by the other side
+		if handle is not None:
+			segment = self.shared_memory.open(handle)
+			mirror = {'a': segment['a'], 'p': None}
+
+		# Mirror is a fresh copy of the data
+		else:
+			pointer = generate_pointer_from_bytes(data)
+			mirror = {'a': pointer.value, 'p': pointer}
+
+		with self.__lock__:
+			self.__mirrors__[pin_id] = mirror
+
+
+	def server_pull(self, pin_id, offset, length):
+		"""
+		Exposed interface
+		"""
+
+		return serialize_pointer_into_buffer(ctypes.c_void_p(self.server_address(pin_id, offset)), length)
+
+
+	def server_push(self, pin_id, offset, data):
+		"""
+		Exposed interface
+		"""
+
+		overwrite_pointer_with_bytes(ctypes.c_void_p(self.server_address(pin_id, offset)), data)
+
+
+	def server_unpin(self, pin_id):
+		"""
+		Exposed interface
+		"""
+
+		with self.__lock__:
+			self.__mirrors__.pop(pin_id)
+
+
+	def terminate(self):
+
+		with self.__lock__:
+			self.__buffers__.clear()
+			self.__mirrors__.clear()
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS: Pinned buffer
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class pinned_buffer_class():
+
+
+	def __init__(self, pinned_memory, rpc_client, pin_id, buffer):
+
+		# Store registry, connection to other side and id
+		self.pinned_memory = pinned_memory
+		self.rpc_client = rpc_client
+		self.id = pin_id
+
+		# Keep buffer alive as long as it is pinned
+		self.buffer = buffer
+		self.address = ctypes.addressof(buffer)
+		self.length = ctypes.sizeof(buffer)
+
+		# Large buffers are mirrored in shared memory, others are copied once
+		shared_memory = self.pinned_memory.shared_memory
+		if shared_memory is not None and shared_memory.accepts(self.length):
+			self.segment = shared_memory.acquire(self.length)
+			ctypes.memmove(self.segment['a'], self.address, self.length)
+			self.rpc_client.pin_buffer(self.id, self.length, b'', self.segment['h'])
+		else:
+			self.segment = None
+			self.rpc_client.pin_buffer(self.id, self.length, serialize_pointer_into_buffer(
+				ctypes.c_void_p(self.address), self.length, copy = False
+				), None)
+
+		# Pinned
+		self.pinned = True
+
+
+	def pull(self, offset = 0, length = None):
+
+		offset, length = self.__get_range__(offset, length)
+
+		# Copy mirror into buffer
+		if self.segment is not None:
+			ctypes.memmove(self.address + offset, self.segment['a'] + offset, length)
+		else:
+			overwrite_pointer_with_bytes(
+				ctypes.c_void_p(self.address + offset), self.rpc_client.pull_buffer(self.id, offset, length)
+				)
+
+
+	def push(self, offset = 0, length = None):
+
+		offset, length = self.__get_range__(offset, length)
+
+		# Copy buffer into mirror
+		if self.segment is not None:
+			ctypes.memmove(self.segment['a'] + offset, self.address + offset, length)
+		else:
+			self.rpc_client.push_buffer(self.id, offset, serialize_pointer_into_buffer(
+				ctypes.c_void_p(self.address + offset), length, copy = False
+				))
+
+
+	def unpin(self):
+
+		# Run only if still pinned
+		if not self.pinned:
+			return
+
+		# Drop mirror and hand back shared memory segment
+		self.pinned_memory.client_unpin(self.id)
+		self.rpc_client.unpin_buffer(self.id)
+		if self.segment is not None:
+			self.pinned_memory.shared_memory.release(self.segment)
+			self.segment = None
+
+		# Not pinned anymore
+		self.pinned = False
+		self.buffer = None
+
+
+	def __get_range__(self, offset, length):
+
+		if not self.pinned:
+			raise ValueError('buffer is not pinned')
+
+		# Default: Everything from offset to end of buffer
+		if length is None:
+			length = self.length - offset
+
+		if offset < 0 or length < 0 or offset + length > self.length:
+			raise ValueError('range exceeds pinned buffer')
+
+		return offset, length
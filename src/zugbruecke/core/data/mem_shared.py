@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	src/zugbruecke/core/data/mem_shared.py: Shared memory segments for memsync
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import ctypes
+import mmap
+import os
+import tempfile
+import threading
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS: Shared memory segments
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class shared_memory_class():
+
+
+	def __init__(self, session_id, threshold = 0, path_unix_to_wine = None):
+
+		# Store session id (part of file names)
+		self.id = session_id
+
+		# Minimum size of buffers in bytes, 0 disables shared memory on this side
+		self.threshold = threshold
+
+		# Path conversion, only required on Wine side
+		self.__path_unix_to_wine__ = path_unix_to_wine
+
+		# Segments are created and handed out from different threads
+		self.__lock__ = threading.Lock()
+
+		# Counter for unique segment names
+		self.__counter__ = 0
+
+		# All segments created or opened by this side, by name
+		self.__segments__ = {}
+
+		# Segments created on this side, which are currently not in use
+		self.__segments_free__ = []
+
+		# Directory backed by memory if available
+		if os.path.isdir('/dev/shm'):
+			self.dir = '/dev/shm'
+		else:
+			self.dir = tempfile.gettempdir()
+
+
+	def acquire(self, length):
+
+		with self.__lock__:
+
+			# Re-use the smallest free segment, which is large enough
+			candidates = [segment for segment in self.__segments_free__ if segment['l'] >= length]
+			if len(candidates) > 0:
+				segment = min(candidates, key = lambda item: item['l'])
+				self.__segments_free__.remove(segment)
+				return segment
+
+			# Name of new segment
+			name = 'zugbruecke_%s_%d' % (self.id, self.__counter__)
+			self.__counter__ += 1
+
+		# Round size up to a power of two (at least one page), so segments can be re-used
+		size = mmap.PAGESIZE
+		while size < length:
+			size *= 2
+
+		# Create file (readable by owner only, never an existing one) and map it
+		path = os.path.join(self.dir, name)
+		with os.fdopen(os.open(path, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600), 'r+b') as f:
+			f.truncate(size)
+			segment = self.__map_segment__(name, path, size, f)
+
+		with self.__lock__:
+			self.__segments__[name] = segment
+
+		return segment
+
+
+	def accepts(self, length):
+
+		return self.threshold > 0 and length >= self.threshold
+
+
+	def open(self, handle):
+
+		name, path, size = handle
+
+		with self.__lock__:
+			if name in self.__segments__.keys():
+				return self.__segments__[name]
+
+		# Map segment created by the other side
+		with open(self.__path_unix_to_wine__(path), 'r+b') as f:
+			segment = self.__map_segment__(name, path, size, f)
+
+		with self.__lock__:
+			self.__segments__[name] = segment
+
+		return segment
+
+
+	def release(self, segment):
+
+		with self.__lock__:
+			self.__segments_free__.append(segment)
+
+
+	def terminate(self):
+
+		with self.__lock__:
+
+			for segment in self.__segments__.values():
+
+				# Drop the exported buffer before closing the map
+				segment['b'] = None
+				segment['m'].close()
+
+				# Only the creating side removes the file
+				if self.__path_unix_to_wine__ is None:
+					try:
+						os.remove(segment['p'])
+					except OSError:
+						pass
+
+			self.__segments__.clear()
+			self.__segments_free__.clear()
+
+
+	def __map_segment__(self, name, path, size, f):
+
+		memory_map = mmap.mmap(f.fileno(), size)
+		buffer = ctypes.c_char.from_buffer(memory_map)
+
+		return {
+			'n': name, # name of segment
+			'p': path, # Unix path of backing file
+			'l': size, # size in bytes
+			'm': memory_map, # memory map
+			'b': buffer, # exported buffer, keeps address valid
+			'a': ctypes.addressof(buffer), # local address of segment
+			'h': (name, path, size) # handle for the other side
+			}
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	src/zugbruecke/core/data/mem_streamed.py: Streaming large memsync buffers in chunks
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import ctypes
+import threading
+
+from .memory import (
+	overwrite_pointer_with_bytes,
+	serialize_pointer_into_buffer
+	)
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS: Streamed memory
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class streamed_memory_class():
+
+
+	def __init__(self, parameter, rpc_client = None):
+
+		# Parameters hold size of chunks in bytes ('memsync_stream'), 0 disables streaming on this side
+		self.p = parameter
+
+		# Connection to other side, used for reading its streams
+		self.rpc_client = rpc_client
+
+		# Streams are offered and read from different threads
+		self.__lock__ = threading.Lock()
+
+		# Counter for unique stream ids
+		self.__counter__ = 0
+
+		# Memory offered to the other side by stream id
+		self.__streams__ = {}
+
+
+	def accepts(self, length):
+
+		return self.p.get('memsync_stream', 0) > 0 and length > self.p['memsync_stream']
+
+
+	def offer(self, address, length, keep = None):
+
+		with self.__lock__:
+
+			stream_id = self.__counter__
+			self.__counter__ += 1
+
+			# Keep reference on owner of memory until it has been read
+			self.__streams__[stream_id] = {'a': address, 'l': length, 'k': keep}
+
+		# Handle for the other side: id and size of chunks
+		return stream_id, self.p['memsync_stream']
+
+
+	def drop(self, stream_id):
+
+		# Streams, which were not (entirely) read, release their memory
+		with self.__lock__:
+			self.__streams__.pop(stream_id, None)
+
+
+	def read(self, stream_id, offset, length):
+		"""
+		Exposed interface
+		"""
+
+		with self.__lock__:
+
+			stream = self.__streams__[stream_id]
+
+			# Stream is done once its last chunk is read
+			last = offset + length >= stream['l']
+			if last:
+				self.__streams__.pop(stream_id)
+
+		# Chunks are sent straight from memory, the last one is copied as the owner may go away
+		return serialize_pointer_into_buffer(ctypes.c_void_p(stream['a'] + offset), length, copy = last)
+
+
+	def receive(self, handle, address, length):
+
+		stream_id, chunk = handle
+
+		# Ranges of chunks
+		ranges = [(offset, min(chunk, length - offset)) for offset in range(0, length, chunk)]
+
+		# Request next chunk while the current one is copied into memory
+		pending = self.rpc_client.__request__('read_stream', stream_id, *ranges[0])
+		for index, (offset, size) in enumerate(ranges):
+			data = pending.result()
+			if index + 1 < len(ranges):
+				pending = self.rpc_client.__request__('read_stream', stream_id, *ranges[index + 1])
+			overwrite_pointer_with_bytes(ctypes.c_void_p(address + offset), data)
+
+
+	def terminate(self):
+
+		with self.__lock__:
+			self.__streams__.clear()
@@ -32,21 +32,67 @@ specific language governing rights and limitations under the License.
 
 import ctypes
 
+from ..const import (
+	MEMSYNC_DIFF_BLOCK,
+	RPC_BUFFER_MIN
+	)
+
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-def generate_pointer_from_bytes(in_bytes):
+def diff_bytes_into_runs(old_bytes, new_bytes):
+
+	# Runs of changed blocks as list of [offset, data]
+	runs = []
+	length = len(new_bytes)
+
+	# Compare block by block, merging adjacent changed blocks into one run
+	for offset in range(0, length, MEMSYNC_DIFF_BLOCK):
+		end = min(offset + MEMSYNC_DIFF_BLOCK, length)
+		if old_bytes[offset:end] == new_bytes[offset:end]:
+			continue
+		if len(runs) > 0 and runs[-1][1] == offset:
+			runs[-1][1] = end
+		else:
+			runs.append([offset, end])
+
+	return [(start, new_bytes[start:end]) for start, end in runs]
+
+
+def generate_pointer_from_bytes(in_bytes, copy = False):
+
+	# Buffers received out-of-band are writable and can be used in place
+	if isinstance(in_bytes, bytearray) and not copy:
+		return ctypes.cast(ctypes.pointer((ctypes.c_ubyte * len(in_bytes)).from_buffer(in_bytes)), ctypes.c_void_p)
 
 	return ctypes.cast(ctypes.pointer((ctypes.c_ubyte * len(in_bytes)).from_buffer_copy(in_bytes)), ctypes.c_void_p)
 
 
 def overwrite_pointer_with_bytes(ctypes_pointer, in_bytes):
 
+	# Buffers received out-of-band are writable and can be copied from directly
+	if isinstance(in_bytes, bytearray):
+		ctypes.memmove(ctypes_pointer, (ctypes.c_ubyte * len(in_bytes)).from_buffer(in_bytes), len(in_bytes))
+		return
+
 	ctypes.memmove(ctypes_pointer, ctypes.pointer((ctypes.c_ubyte * len(in_bytes)).from_buffer_copy(in_bytes)), len(in_bytes))
 
 
+def serialize_pointer_into_buffer(ctypes_pointer, size_bytes, copy = True):
+
+	# Small sections are embedded into pickles as bytes
+	if size_bytes < RPC_BUFFER_MIN:
+		return serialize_pointer_into_bytes(ctypes_pointer, size_bytes)
+
+	# Large sections are sent out-of-band, either copied or directly from memory (must stay valid until sent)
+	data = ctypes.cast(ctypes_pointer, ctypes.POINTER(ctypes.c_ubyte * size_bytes)).contents
+	if copy:
+		return bytearray(data)
+	return memoryview(data)
+
+
 def serialize_pointer_into_bytes(ctypes_pointer, size_bytes):
 
 	return bytes(ctypes.cast(ctypes_pointer, ctypes.POINTER(ctypes.c_ubyte * size_bytes)).contents)
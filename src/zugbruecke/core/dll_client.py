@@ -31,6 +31,11 @@ specific language governing rights and limitations under the License.
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import os
+import pickle
+import traceback
+
+from .const import RPC_PICKLE_PROTOCOL
 from .routine_client import routine_client_class
 
 
@@ -62,17 +67,78 @@ class dll_client_class(): # Representing one idividual dll to be called into, re
 		# Start dict for dll routines
 		self.routines = {}
 
+		# Routines configured on server from cache: Configuration, handles and result by name
+		self.preloaded = {}
+
+		# Configurations of routines (for cache) by name
+		self.prototypes = {}
+
+		# Registered types from cache by id
+		self.prototype_types = {}
+
+		# Path of cache file and stamp of DLL file (None if there is no cache)
+		self.cache_path = None
+		self.stamp = None
+
 		# Expose routine registration
 		self.__register_routine_on_server__ = getattr(self.rpc_client, self.hash_id + '_register_routine')
 
+		# Expose bulk registration and configuration of routines
+		self.__declare_on_server__ = getattr(self.rpc_client, self.hash_id + '_declare')
+
 		# Expose string reprentation of dll object
 		self.__get_repr__ = getattr(self.rpc_client, self.hash_id + '_repr')
 
 
+	def declare(self, prototypes):
+
+		# Log status
+		self.log.out('[dll-client] Declaring %d routines in DLL file "%s" ...', len(prototypes), self.name)
+
+		# Set up routines without handles, prototype is (argtypes, restype[, memsync])
+		routine_list = []
+		for name, prototype in prototypes.items():
+			if isinstance(name, str) and name.startswith('__') and name.endswith('__'):
+				raise AttributeError(name) # Original ctypes does that
+			if len(prototype) not in (2, 3):
+				raise ValueError('prototype of "%s" must be (argtypes, restype[, memsync])' % str(name))
+			routine = routine_client_class(self, name, None)
+			routine.argtypes = prototype[0]
+			routine.restype = prototype[1]
+			if len(prototype) == 3:
+				routine.memsync = prototype[2]
+			routine_list.append(routine)
+
+		# Describe all routines, types shared between them are shipped once
+		types_list = []
+		configuration_list = [
+			(routine.name, routine.__pack_configuration__(types_list)) for routine in routine_list
+			]
+
+		# Register and configure all routines in one go
+		declaration_list = self.__declare_on_server__(configuration_list, types_list)
+		self.prototypes.update(configuration_list)
+
+		# Server knows about shipped types now
+		self.session.data.confirm_definition_message(types_list)
+
+		# Routines are configured, attach them
+		for routine, (handles, result) in zip(routine_list, declaration_list):
+			routine.__attach_handles__(handles)
+			routine.__unpack_configuration__(result)
+			routine.called = True
+			self.routines[routine.name] = routine
+			if isinstance(routine.name, str):
+				setattr(self, routine.name, routine)
+
+		# Log status
+		self.log.out('[dll-client] ... done.')
+
+
 	def __attach_to_routine__(self, name):
 
 		# Status log
-		self.log.out('[dll-client] Trying to attach to routine "%s" in DLL file "%s" ...' % (str(name), self.name))
+		self.log.out('[dll-client] Trying to attach to routine "%s" in DLL file "%s" ...', str(name), self.name)
 
 		# Log status
 		self.log.out('[dll-client] ... unknown, registering  ...')
@@ -86,8 +152,11 @@ class dll_client_class(): # Representing one idividual dll to be called into, re
 
 		try:
 
-			# Register routine in wine
-			self.__register_routine_on_server__(name)
+			# Routine was preloaded from cache or register routine in wine, get handles of its remote functions
+			if name in self.preloaded.keys():
+				handles = self.preloaded[name][1]
+			else:
+				handles = self.__register_routine_on_server__(name)
 
 		except AttributeError as e:
 
@@ -97,7 +166,7 @@ class dll_client_class(): # Representing one idividual dll to be called into, re
 			raise e
 
 		# Create new instance of routine_client
-		self.routines[name] = routine_client_class(self, name)
+		self.routines[name] = routine_client_class(self, name, handles)
 
 		# Log status
 		self.log.out('[dll-client] ... registered (unconfigured) ...')
@@ -115,6 +184,58 @@ class dll_client_class(): # Representing one idividual dll to be called into, re
 		return self.routines[name]
 
 
+	def __preload__(self, cache_path, stamp, prototypes, declaration_list):
+
+		# Remember where to write cache
+		self.cache_path = cache_path
+		self.stamp = stamp
+
+		# Cached prototypes are only valid for the very same DLL file and if server accepted them
+		if prototypes is None or prototypes['stamp'] != stamp or len(declaration_list) == 0:
+			return
+
+		# Log status
+		self.log.out('[dll-client] Preloaded %d routines in DLL file "%s" from cache.', len(declaration_list), self.name)
+
+		# Keep cached prototypes for the next cache file
+		self.prototypes.update(prototypes['routines'])
+		self.prototype_types.update(prototypes['types'])
+
+		# Server knows about cached types now
+		self.session.data.confirm_definition_message(prototypes['types'])
+
+		# Routines are registered and configured on server
+		for (name, configuration), (handles, result) in zip(prototypes['routines'], declaration_list):
+			self.preloaded[name] = (configuration, handles, result)
+
+
+	def __write_prototype_cache__(self):
+
+		# Is there anything to cache?
+		if self.cache_path is None or self.stamp is None or len(self.prototypes) == 0:
+			return
+
+		# Routines and all types they refer to
+		routines = list(self.prototypes.items())
+		types = self.session.data.collect_definitions(
+			[arg_w for _, configuration in routines for arg_w in configuration[0] + [configuration[1]]],
+			self.prototype_types
+			)
+
+		# Replace cache file at once, a broken cache must not break the session
+		try:
+			os.makedirs(os.path.dirname(self.cache_path), exist_ok = True)
+			with open(self.cache_path + '.tmp', 'wb') as f:
+				pickle.dump({
+					'stamp': self.stamp,
+					'types': types,
+					'routines': routines
+					}, f, protocol = RPC_PICKLE_PROTOCOL)
+			os.replace(self.cache_path + '.tmp', self.cache_path)
+		except Exception:
+			self.log.err(traceback.format_exc())
+
+
 	def __getattr__(self, name):
 
 		if name in ['__objclass__']:
@@ -31,9 +31,15 @@ specific language governing rights and limitations under the License.
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import ctypes
+import os
+import threading
 import traceback
 
-from .lib import get_hash_of_string
+from .lib import (
+	concurrency_limit_class,
+	get_hash_of_string
+	)
 from .routine_server import routine_server_class
 
 
@@ -44,7 +50,7 @@ from .routine_server import routine_server_class
 class dll_server_class(): # Representing one idividual dll to be called into
 
 
-	def __init__(self, parent_session, dll_name, dll_type, handler):
+	def __init__(self, parent_session, dll_name, dll_type, handler, concurrency = None):
 
 		# Store dll parameters name, path and type
 		self.name = dll_name
@@ -61,6 +67,10 @@ class dll_server_class(): # Representing one idividual dll to be called into
 
 		# Start dict for dll routines
 		self.routines = {}
+		self.routines_lock = threading.Lock()
+
+		# Maximum number of concurrent calls into this dll (None for no limit)
+		self.limit = concurrency_limit_class(concurrency)
 
 		# Hash my own path as unique ID
 		self.hash_id = get_hash_of_string(self.name)
@@ -74,6 +84,73 @@ class dll_server_class(): # Representing one idividual dll to be called into
 			self.__register_routine__,
 			self.hash_id + '_register_routine'
 			)
+		self.session.rpc_server.register_function(
+			self.__declare__,
+			self.hash_id + '_declare'
+			)
+
+
+	def __declare__(self, configuration_list, types_list):
+		"""
+		Exposed interface
+		"""
+
+		# Log status
+		self.log.out('[dll-server] Declaring %d routines in DLL file "%s" ...', len(configuration_list), self.name)
+
+		# Register types shared by routines first
+		self.session.data.register_definitions(types_list)
+
+		# Register and configure every routine, collect handles and configuration results
+		declaration_list = []
+		for routine_name, configuration in configuration_list:
+			handles = self.__register_routine__(routine_name)
+			declaration_list.append((
+				handles, self.routines[routine_name].__configure__(*configuration)
+				))
+
+		# Log status
+		self.log.out('[dll-server] ... done.')
+
+		return declaration_list
+
+
+	def __get_stamp__(self):
+
+		# Path of DLL file as resolved by Windows, if possible
+		path = self.handler._name
+		try:
+			buffer = ctypes.create_unicode_buffer(32768)
+			if ctypes.windll.kernel32.GetModuleFileNameW(ctypes.c_void_p(self.handler._handle), buffer, 32768) > 0:
+				path = buffer.value
+		except Exception:
+			pass
+
+		# Changes to DLL file change its stamp
+		try:
+			stat = os.stat(path)
+		except OSError:
+			return None
+
+		return (path, stat.st_mtime, stat.st_size)
+
+
+	def __preload__(self, prototypes):
+
+		# Stamp of DLL file, cached prototypes are only valid for identical DLL file
+		stamp = self.__get_stamp__()
+		if prototypes is None or stamp is None or prototypes['stamp'] != stamp:
+			return stamp, []
+
+		# Log status
+		self.log.out('[dll-server] Preloading cached prototypes for DLL file "%s" ...', self.name)
+
+		# Register and configure routines from cache
+		try:
+			return stamp, self.__declare__(prototypes['routines'], prototypes['types'])
+		except Exception:
+			self.log.err(traceback.format_exc())
+			return stamp, []
 
 
 	def __get_repr__(self):
@@ -86,12 +163,19 @@ class dll_server_class(): # Representing one idividual dll to be called into
 		Exposed interface
 		"""
 
+		# Routines may be registered by several workers at once, each one exactly once
+		with self.routines_lock:
+			return self.__attach_routine__(routine_name)
+
+
+	def __attach_routine__(self, routine_name):
+
 		# Just in case this routine is already known
 		if routine_name in self.routines.keys():
-			return True # Success
+			return self.routines[routine_name].handles
 
 		# Log status
-		self.log.out('[dll-server] Trying to access "%s" in DLL file "%s" ...' % (str(routine_name), self.name))
+		self.log.out('[dll-server] Trying to access "%s" in DLL file "%s" ...', str(routine_name), self.name)
 
 		# Try to attach to routine with ctypes
 		try:
@@ -127,15 +211,16 @@ class dll_server_class(): # Representing one idividual dll to be called into
 		# Generate new instance of routine class
 		self.routines[routine_name] = routine_server_class(self, routine_name, routine_handler)
 
-		# Export call and configration directly
-		self.session.rpc_server.register_function(
-			self.routines[routine_name],
-			self.hash_id + '_' + str(routine_name) + '_handle_call'
-			)
-		self.session.rpc_server.register_function(
-			self.routines[routine_name].__configure__,
-			self.hash_id + '_' + str(routine_name) + '_configure'
-			)
+		# Export call and configration directly, under compact integer handles
+		self.routines[routine_name].handles = {
+			'call': self.session.rpc_server.register_handle(self.routines[routine_name]),
+			'call_many': self.session.rpc_server.register_handle(self.routines[routine_name].call_many),
+			'call_scalar': self.session.rpc_server.register_handle(self.routines[routine_name].call_scalar),
+			'configure': self.session.rpc_server.register_handle(self.routines[routine_name].__configure__)
+			}
 
 		# Log status
 		self.log.out('[dll-server] ... done.')
+
+		# Return handles to client
+		return self.routines[routine_name].handles
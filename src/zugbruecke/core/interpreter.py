@@ -36,6 +36,30 @@ import signal
 import subprocess
 import threading
 
+from .lib import get_location_of_file
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_server_command(session_id, parameter):
+
+	# Command with minimal meta info. All other info can be passed via sockets.
+	return [
+		os.path.join(
+			os.path.abspath(os.path.join(get_location_of_file(__file__), os.pardir)),
+			'_server_.py'
+			),
+		'--id', session_id,
+		'--port_socket_wine', str(parameter['port_socket_wine']),
+		'--port_socket_unix', str(parameter['port_socket_unix']),
+		'--log_level', str(parameter['log_level']),
+		'--log_write', str(int(parameter['log_write'])),
+		'--server_workers', str(parameter['server_workers']),
+		'--memsync_stream', str(parameter['memsync_stream'])
+		]
+
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # WINE PYTHON INTERPRETER CLASS
@@ -45,13 +69,19 @@ class interpreter_session_class():
 
 
 	# session init
-	def __init__(self, session_id, parameter, session_log):
+	def __init__(self, session_id, parameter, session_log, on_exit = None):
 
 		# Set ID, parameters and pointer to log
 		self.id = session_id
 		self.p = parameter
 		self.log = session_log
 
+		# Called with exit code once Wine-Python has exited, likely None
+		self.on_exit = on_exit
+
+		# Exit code of Wine-Python, None while it is running
+		self.exit_code = None
+
 		# Log status
 		self.log.out('[interpreter] STARTING ...')
 
@@ -125,7 +155,7 @@ class interpreter_session_class():
 			)
 
 		# Status log
-		self.log.out('[interpreter] Started with PID %d.' % self.proc_winepython.pid)
+		self.log.out('[interpreter] Started with PID %d.', self.proc_winepython.pid)
 
 		# Prepare threads for stdout and stderr capturing of Wine
 		# BUG does not capture stdout from windows binaries (running with Wine) most of the time
@@ -140,8 +170,14 @@ class interpreter_session_class():
 			name = 'err'
 			)
 
+		# Prepare thread noticing the exit of Wine-Python
+		self.thread_winepython_exit = threading.Thread(
+			target = self.__wait_for_exit__,
+			name = 'exit'
+			)
+
 		# Start threads
-		for t in (self.thread_winepython_out, self.thread_winepython_err):
+		for t in (self.thread_winepython_out, self.thread_winepython_err, self.thread_winepython_exit):
 			t.daemon = True
 			t.start()
 
@@ -149,13 +185,27 @@ class interpreter_session_class():
 		self.log.out('[interpreter] Logging threads started.')
 
 
+	def __wait_for_exit__(self):
+
+		# Block until Wine-Python exits
+		self.exit_code = self.proc_winepython.wait()
+
+		# Log status
+		if self.up:
+			self.log.out('[interpreter] Exited with code %d.', self.exit_code)
+
+		# Notify owner
+		if self.on_exit is not None:
+			self.on_exit(self.exit_code)
+
+
 	def __python_stop__(self):
 
 		# Terminate Wine-Python
 		os.killpg(os.getpgid(self.proc_winepython.pid), signal.SIGINT)
 
 		for t_index, t in enumerate([self.thread_winepython_out, self.thread_winepython_err]):
-			self.log.out('[interpreter] Joining logging thread "%s" ...' % t.name)
+			self.log.out('[interpreter] Joining logging thread "%s" ...', t.name)
 			t.join(timeout = 1) # seconds
 
 		# Log status
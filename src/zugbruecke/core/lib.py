@@ -34,22 +34,40 @@ specific language governing rights and limitations under the License.
 import hashlib
 import os
 import random
-import socket
+import threading
 
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-# LIBRARY ROUTINES
+# LIBRARY CLASSES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-def get_free_port():
+class concurrency_limit_class():
+
+
+	def __init__(self, limit = None):
+
+		# Maximum number of threads inside, None for no limit
+		self.limit = limit
+
+		# Only required if there is a limit
+		self.semaphore = threading.BoundedSemaphore(limit) if limit is not None else None
+
+
+	def __enter__(self):
 
-	s = socket.socket()
-	s.bind(('', 0))
-	port = s.getsockname()[1]
-	s.close()
+		if self.semaphore is not None:
+			self.semaphore.acquire()
 
-	return port
 
+	def __exit__(self, exc_type, exc_value, traceback):
+
+		if self.semaphore is not None:
+			self.semaphore.release()
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# LIBRARY ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 def get_hash_of_string(str_in):
 
@@ -32,7 +32,9 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import json
+import queue
 import sys
+import threading
 import time
 
 
@@ -55,6 +57,15 @@ c = {
 	'WHITE': '\033[1;37m'
 	}
 
+# Maximum number of messages waiting to be shipped to the Unix side
+LOG_QUEUE_MAX = 1024
+
+# Maximum number of messages shipped to the Unix side at once
+LOG_BATCH_MAX = 256
+
+# Seconds between flushes of open logfiles
+LOG_FLUSH_INTERVAL = 1.0
+
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # LOG CLASS
@@ -81,32 +92,52 @@ class log_class:
 		if 'platform' not in self.p.keys():
 			self.p['platform'] = 'UNIX'
 
-		# Open logfiles
+		# Names of logfiles
 		if self.p['log_write']:
 			self.f = {}
 			self.f['out'] = '%s_%s.txt' % (self.p['platform'], 'out')
 			self.f['err'] = '%s_%s.txt' % (self.p['platform'], 'err')
 
+		# Logfiles are opened on demand and kept open (while log is up)
+		self.__files__ = {}
+		self.__files_lock__ = threading.Lock()
+		self.__files_flushed__ = time.time()
+
 		# Fire up server if required
 		self.server_port = 0
 		if rpc_server is not None:
 			self.server = rpc_server
-			self.server.register_function(self.__receive_message_from_client__, 'transfer_message')
+			self.server.register_function(self.__receive_messages_from_client__, 'transfer_messages')
 
 		# Fire up client if required
 		if rpc_client is not None:
 			self.client = rpc_client
 
+			# Messages are shipped in batches by a background thread
+			self.__queue__ = queue.Queue(maxsize = LOG_QUEUE_MAX)
+			self.__pusher__ = threading.Thread(target = self.__push_messages_to_server__)
+			self.__pusher__.daemon = True
+			self.__pusher__.start()
+
 
 	def terminate(self):
 
 		if self.up:
 
-			# Nothing to do, just a placeholder
-
-			# Log down
+			# Log down, subsequent messages are shipped directly
 			self.up = False
 
+			# Ship remaining messages and stop background thread
+			if hasattr(self, 'client'):
+				self.__queue__.put(None)
+				self.__pusher__.join(timeout = 5)
+
+			# Flush and close logfiles
+			with self.__files_lock__:
+				for f in self.__files__.values():
+					f.close()
+				self.__files__.clear()
+
 
 	def __append_message_to_log__(self, message):
 
@@ -163,7 +194,7 @@ class log_class:
 		elif messages['pipe'] == 'err':
 			sys.stderr.write(message_string)
 		else:
-			raise # TODO
+			raise ValueError('unknown pipe %r' % messages['pipe'])
 
 
 	def __process_message__(self, message, pipe, level):
@@ -188,28 +219,103 @@ class log_class:
 
 	def __push_message_to_server__(self, message):
 
-		self.client.transfer_message(json.dumps(message))
+		# Queue message for background thread as long as it is running
+		if self.up:
+			self.__queue__.put(message)
+		else:
+			self.client.transfer_messages([message])
+
+
+	def __push_messages_to_server__(self):
+
+		while True:
+
+			# Wait for next message, flush logfiles while waiting
+			try:
+				batch = [self.__queue__.get(timeout = LOG_FLUSH_INTERVAL)]
+			except queue.Empty:
+				self.__flush_files__()
+				continue
 
+			# Collect whatever else is waiting
+			while len(batch) < LOG_BATCH_MAX and batch[-1] is not None:
+				try:
+					batch.append(self.__queue__.get_nowait())
+				except queue.Empty:
+					break
 
-	def __receive_message_from_client__(self, message):
+			# None indicates termination
+			stop = batch[-1] is None
+			if stop:
+				batch.pop()
 
-		self.__process_message_dict__(json.loads(message))
+				# Collect messages, which were queued by other threads after termination
+				while True:
+					try:
+						batch.append(self.__queue__.get_nowait())
+					except queue.Empty:
+						break
+
+			# Ship batches in one go each, messages are lost if the Unix side is gone
+			for index in range(0, len(batch), LOG_BATCH_MAX):
+				try:
+					self.client.transfer_messages(batch[index:index + LOG_BATCH_MAX])
+				except Exception:
+					pass
+
+			if stop:
+				return
+
+
+	def __receive_messages_from_client__(self, messages):
+
+		for message in messages:
+			self.__process_message_dict__(message)
+
+
+	def __flush_files__(self):
+
+		with self.__files_lock__:
+			for f in self.__files__.values():
+				f.flush()
+			self.__files_flushed__ = time.time()
 
 
 	def __store_message__(self, message):
 
-		f = open(self.f[message['pipe']], 'a+')
-		f.write(json.dumps(message) + '\n')
-		f.close()
+		with self.__files_lock__:
+
+			# Logfiles are not kept open after termination
+			if not self.up:
+				with open(self.f[message['pipe']], 'a+') as f:
+					f.write(json.dumps(message) + '\n')
+				return
+
+			if message['pipe'] not in self.__files__.keys():
+				self.__files__[message['pipe']] = open(self.f[message['pipe']], 'a+')
+			self.__files__[message['pipe']].write(json.dumps(message) + '\n')
+
+			# Flush logfiles from time to time (the Wine side also flushes while idle)
+			if time.time() - self.__files_flushed__ >= LOG_FLUSH_INTERVAL:
+				for f in self.__files__.values():
+					f.flush()
+				self.__files_flushed__ = time.time()
+
+
+	def is_enabled(self, level = 1):
+
+		return level <= self.p['log_level']
 
 
-	def out(self, message, level = 1):
+	def out(self, message, *args, level = 1):
 
+		# Messages are only formatted if they are actually logged
 		if level <= self.p['log_level']:
-			self.__process_message__(message, 'out', level)
+			self.__process_message__(message % args if args else message, 'out', level)
 
 
-	def err(self, message, level = 1):
+	def err(self, message, *args, level = 1):
 
+		# Messages are only formatted if they are actually logged
 		if level <= self.p['log_level']:
-			self.__process_message__(message, 'err', level)
+			self.__process_message__(message % args if args else message, 'err', level)
@@ -31,9 +31,12 @@ specific language governing rights and limitations under the License.
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import asyncio
 import ctypes
 from functools import partial
 from pprint import pformat as pf
+import struct
+import threading
 
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -43,7 +46,7 @@ from pprint import pformat as pf
 class routine_client_class():
 
 
-	def __init__(self, parent_dll, routine_name):
+	def __init__(self, parent_dll, routine_name, handles):
 
 		# Store handle on parent dll
 		self.dll = parent_dll
@@ -63,8 +66,9 @@ class routine_client_class():
 		# Required by arg definitions and contents
 		self.data = self.session.data
 
-		# Set call status
+		# Set call status, first calls from several threads configure only once
 		self.called = False
+		self.called_lock = threading.Lock()
 
 		# By default, there is no memory to sync
 		self.__memsync__ = []
@@ -75,27 +79,182 @@ class routine_client_class():
 		# By default, assume c_int return value like ctypes expects
 		self.__restype__ = ctypes.c_int
 
-		# Get handle on server-side configure
-		self.__configure_on_server__ = getattr(
-			self.rpc_client, self.dll.hash_id + '_' + str(self.name) + '_configure'
-			)
+		# By default, there is no limit on concurrent calls
+		self.__concurrency__ = None
 
-		# Get handle on server-side handle_call
-		self.__handle_call_on_server__ = getattr(
-			self.rpc_client, self.dll.hash_id + '_' + str(self.name) + '_handle_call'
-			)
+		# By default, classify arguments as input or output by their types
+		self.__paramflags__ = None
+
+		# Packs plain scalar arguments if server agreed on a fast path
+		self.__scalar_struct__ = None
+
+		# Get handles on server-side routine (declared routines get them later)
+		if handles is not None:
+			self.__attach_handles__(handles)
 
 
 	def __call__(self, *args):
-		"""
-		TODO Optimize for speed!
-		"""
 
 		# Log status
-		self.log.out('[routine-client] Trying to call routine "%s" in DLL file "%s" ...' % (self.name, self.dll.name))
+		self.log.out('[routine-client] Trying to call routine "%s" in DLL file "%s" ...', self.name, self.dll.name)
+
+		# Configure routine on first call
+		self.__configure_once__()
+
+		# Plain scalar arguments and return value: No packing and syncing, generic path otherwise
+		if self.__scalar_struct__ is not None:
+			try:
+				arg_block = self.__scalar_struct__.pack(*args)
+			except (struct.error, OverflowError):
+				pass
+			else:
+				return self.__handle_call_scalar_on_server__(arg_block)
+
+		# Log status
+		self.log.out('[routine-client] ... parameters are "%r". Packing and pushing to server ...', args)
+
+		# Pack arguments and memory
+		arg_message_list, mem_package_list = self.__pack_call__(args)
+
+		try:
+
+			# Actually call routine in DLL! TODO Handle kw ...
+			return_dict = self.__handle_call_on_server__(arg_message_list, mem_package_list)
+
+			# Log status
+			self.log.out('[routine-client] ... received feedback from server, unpacking & syncing arguments ...')
+
+			# Unpack arguments, return value and memory
+			return self.__unpack_call__(args, return_dict)
+
+		finally:
+
+			# Hand back shared memory and drop streams, which were not read
+			self.data.client_release_memory_list(mem_package_list)
+
+
+	def acall(self, *args, loop = None):
+
+		# Log status
+		self.log.out('[routine-client] Trying to call routine "%s" in DLL file "%s" asynchronously ...', self.name, self.dll.name)
+
+		# Results are delivered to the (current) event loop
+		if loop is None:
+			loop = asyncio.get_event_loop()
+		result = asyncio.Future(loop = loop)
+
+		# Configure routine on first call (blocking, happens only once)
+		self.__configure_once__()
+
+		# Pack arguments and memory
+		arg_message_list, mem_package_list = self.__pack_call__(args)
+
+		# Send call without waiting for the answer
+		try:
+			request = self.__handle_call_on_server_async__(arg_message_list, mem_package_list)
+		except:
+			self.data.client_release_memory_list(mem_package_list)
+			raise
+
+		def unpack_call(request):
+			# Runs in executor: Unpack arguments, return value and memory (reading streams blocks)
+			try:
+				return self.__unpack_call__(args, request.result())
+			finally:
+				self.data.client_release_memory_list(mem_package_list)
+
+		def finish_call(unpacked):
+			# Runs in event loop: Deliver result unless cancelled
+			if result.cancelled():
+				return
+			if unpacked.exception() is not None:
+				result.set_exception(unpacked.exception())
+			else:
+				result.set_result(unpacked.result())
+
+		def start_unpack(request):
+			# Runs in event loop: Unpack even if cancelled
+			loop.run_in_executor(None, unpack_call, request).add_done_callback(finish_call)
+
+		# Answer arrives in RPC receiver thread, hand it over to event loop
+		request.add_done_callback(lambda request: loop.call_soon_threadsafe(start_unpack, request))
+
+		return result
+
+
+	def call_many(self, args_iterable):
+
+		# Log status
+		self.log.out('[routine-client] Trying to call routine "%s" in DLL file "%s" many times ...', self.name, self.dll.name)
+
+		# Configure routine on first call
+		self.__configure_once__()
+
+		# Every item holds the arguments of one call
+		args_list = [tuple(args) for args in args_iterable]
+
+		# Pack arguments and memory of all calls
+		call_list = [self.__pack_call__(args) for args in args_list]
+
+		# Log status
+		self.log.out('[routine-client] ... packed %d calls. Pushing to server ...', len(call_list))
+
+		# Run all calls in one go on the server, which stops after the first failing call
+		return_list = self.__handle_call_many_on_server__(call_list)
+
+		# Log status
+		self.log.out('[routine-client] ... received feedback from server, unpacking & syncing arguments ...')
+
+		# Calls, which were not run, do not hold on to memory
+		for arg_message_list, mem_package_list in call_list[len(return_list):]:
+			self.data.client_release_memory_list(mem_package_list)
+
+		# Unpack calls in order, raises the error of a failed call
+		return_value_list = []
+		for index, (args, return_dict) in enumerate(zip(args_list, return_list)):
+			try:
+				return_value_list.append(self.__unpack_call__(args, return_dict))
+			except:
+				# Calls, which were run but will not be unpacked, do not hold on to memory
+				for arg_message_list, mem_package_list in call_list[index + 1:len(return_list)]:
+					self.data.client_release_memory_list(mem_package_list)
+				raise
+			finally:
+				# Memory of every call is handed back right after unpacking it
+				self.data.client_release_memory_list(call_list[index][1])
+
+		return return_value_list
+
+
+	def __attach_handles__(self, handles):
+
+		# Get handle on server-side configure
+		self.__configure_on_server__ = self.rpc_client.__get_rpc__(handles['configure'])
+
+		# Get handle on server-side handle_call
+		self.__handle_call_on_server__ = self.rpc_client.__get_rpc__(handles['call'])
+
+		# Get handle on server-side handle_call, returning a future
+		self.__handle_call_on_server_async__ = partial(self.rpc_client.__request__, handles['call'])
+
+		# Get handle on server-side handle_call_many
+		self.__handle_call_many_on_server__ = self.rpc_client.__get_rpc__(handles['call_many'])
+
+		# Get handle on server-side call_scalar
+		self.__handle_call_scalar_on_server__ = self.rpc_client.__get_rpc__(handles['call_scalar'])
+
+
+	def __configure_once__(self):
 
 		# Has this routine ever been called?
-		if not self.called:
+		if self.called:
+			return
+
+		with self.called_lock:
+
+			# Another thread may have configured the routine in the meantime
+			if self.called:
+				return
 
 			# Log status
 			self.log.out('[routine-client] ... has not been called before. Configuring ...')
@@ -109,32 +268,26 @@ class routine_client_class():
 			# Log status
 			self.log.out('[routine-client] ... configured. Proceeding ...')
 
-		# Log status
-		self.log.out('[routine-client] ... parameters are "%r". Packing and pushing to server ...' % (args,))
+
+	def __pack_call__(self, args):
 
 		# Handle memory
 		mem_package_list = self.data.client_pack_memory_list(args, self.memsync_d)
 
-		# Actually call routine in DLL! TODO Handle kw ...
-		return_dict = self.__handle_call_on_server__(
-			self.data.arg_list_pack(args, self.argtypes_d), mem_package_list
-			)
+		# Pack arguments
+		return self.data.arg_list_pack(args, self.argtypes_p), mem_package_list
 
-		# Log status
-		self.log.out('[routine-client] ... received feedback from server, unpacking & syncing arguments ...')
+
+	def __unpack_call__(self, args, return_dict):
 
 		# Unpack return dict (call may have failed partially only)
-		self.data.arg_list_sync(
-			args,
-			self.data.arg_list_unpack(return_dict['args'], self.argtypes_d),
-			self.argtypes_d
-			)
+		self.data.arg_list_sync_out(args, return_dict['args'], self.argtypes_p)
 
 		# Log status
 		self.log.out('[routine-client] ... unpacking return value ...')
 
 		# Unpack return value of routine
-		return_value = self.data.return_msg_unpack(return_dict['return_value'], self.restype_d)
+		return_value = self.data.return_msg_unpack(return_dict['return_value'], self.restype_p)
 
 		# Log status
 		self.log.out('[routine-client] ... overwriting memory ...')
@@ -159,6 +312,36 @@ class routine_client_class():
 
 	def __configure__(self):
 
+		# Types the server does not know yet
+		types_list = []
+
+		# Describe argument and return value types
+		configuration = self.__pack_configuration__(types_list)
+
+		# Server may have been configured identically from cache
+		preloaded = self.dll.preloaded.get(self.name, None)
+		if preloaded is not None and preloaded[0] == configuration:
+
+			# Use answer of server from cache
+			result = preloaded[2]
+
+		else:
+
+			# Pass argument and return value types as strings ...
+			result = self.__configure_on_server__(*(configuration + (types_list,)))
+
+			# Server knows about shipped types now
+			self.data.confirm_definition_message(types_list)
+
+		# Remember configuration for cache
+		self.dll.prototypes[self.name] = configuration
+
+		# Apply answer of server
+		self.__unpack_configuration__(result)
+
+
+	def __pack_configuration__(self, types_list):
+
 		# Prepare list of arguments by parsing them into list of dicts (TODO field name / kw)
 		self.argtypes_d = self.data.pack_definition_argtypes(self.__argtypes__)
 
@@ -176,17 +359,45 @@ class routine_client_class():
 			self.memsync_d, self.argtypes_d, self.restype_d
 			)
 
+		# Mark arguments, which are synced back after the call
+		self.data.apply_paramflags_to_argtypes_definition(self.argtypes_d, self.__paramflags__)
+
 		# Log status
-		self.log.out(' memsync: \n%s' % pf(self.memsync_d))
-		self.log.out(' argtypes: \n%s' % pf(self.__argtypes__))
-		self.log.out(' argtypes_d: \n%s' % pf(self.argtypes_d))
-		self.log.out(' restype: \n%s' % pf(self.__restype__))
-		self.log.out(' restype_d: \n%s' % pf(self.restype_d))
-
-		# Pass argument and return value types as strings ...
-		result = self.__configure_on_server__(
-			self.argtypes_d, self.restype_d, memsync_d_packed
-			)
+		if self.log.is_enabled():
+			self.log.out(' memsync: \n%s', pf(self.memsync_d))
+			self.log.out(' argtypes: \n%s', pf(self.__argtypes__))
+			self.log.out(' argtypes_d: \n%s', pf(self.argtypes_d))
+			self.log.out(' restype: \n%s', pf(self.__restype__))
+			self.log.out(' restype_d: \n%s', pf(self.restype_d))
+
+		# Describe memory layouts of arguments and return value for raw transfers
+		layouts_d = {
+			'argtypes': [self.data.get_definition_layout(arg_d) for arg_d in self.argtypes_d],
+			'restype': self.data.get_definition_layout(self.restype_d)
+			}
+
+		# Add types the server does not know yet to list, refer to known ones by id
+		argtypes_w, restype_w, _ = self.data.pack_definition_message(self.argtypes_d, self.restype_d, types_list)
+
+		return argtypes_w, restype_w, memsync_d_packed, layouts_d, self.__concurrency__
+
+
+	def __unpack_configuration__(self, result):
+
+		# Use raw transfers where the server agreed on the memory layout
+		for arg_d, is_binary in zip(self.argtypes_d, result['argtypes']):
+			arg_d['b'] = is_binary
+		self.restype_d['b'] = result['restype']
+
+		# Compile definitions into call plans for arguments and return value
+		self.argtypes_p = self.data.arg_list_compile(self.argtypes_d)
+		self.restype_p = self.data.return_msg_compile(self.restype_d)
+
+		# Server agreed on fast path for plain scalar arguments and return value
+		if result.get('scalar', None) is not None:
+			self.__scalar_struct__ = struct.Struct(result['scalar'])
+		else:
+			self.__scalar_struct__ = None
 
 
 	@property
@@ -204,6 +415,21 @@ class routine_client_class():
 		self.__argtypes__ = value
 
 
+	@property
+	def paramflags(self):
+
+		return self.__paramflags__
+
+
+	@paramflags.setter
+	def paramflags(self, value):
+
+		if value is not None and not isinstance(value, list) and not isinstance(value, tuple):
+			raise TypeError # original ctypes does that
+
+		self.__paramflags__ = value
+
+
 	@property
 	def restype(self):
 
@@ -216,6 +442,21 @@ class routine_client_class():
 		self.__restype__ = value
 
 
+	@property
+	def concurrency(self):
+
+		return self.__concurrency__
+
+
+	@concurrency.setter
+	def concurrency(self, value):
+
+		if value is not None and (not isinstance(value, int) or value < 1):
+			raise ValueError('concurrency must be None or a positive integer')
+
+		self.__concurrency__ = value
+
+
 	@property
 	def memsync(self):
 
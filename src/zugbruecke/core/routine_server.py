@@ -32,8 +32,11 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 from pprint import pformat as pf
+import struct
 import traceback
 
+from .lib import concurrency_limit_class
+
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # DLL SERVER CLASS
@@ -62,19 +65,19 @@ class routine_server_class():
 		# Set routine handler
 		self.handler = routine_handler
 
+		# Maximum number of concurrent calls into this routine (None for no limit)
+		self.limit = concurrency_limit_class()
+
 
 	def __call__(self, arg_message_list, arg_memory_list):
-		"""
-		TODO: Optimize for speed!
-		"""
 
 		# Log status
-		self.log.out('[routine-server] Trying call routine "%s" ...' % self.name)
+		self.log.out('[routine-server] Trying call routine "%s" ...', self.name)
 
 		try:
 
 			# Unpack passed arguments, handle pointers and structs ...
-			args_list = self.data.arg_list_unpack(arg_message_list, self.argtypes_d)
+			args_list = self.data.arg_list_unpack(arg_message_list, self.argtypes_p)
 
 			# Unpack pointer data
 			self.data.server_unpack_memory_list(args_list, arg_memory_list, self.memsync_d)
@@ -91,8 +94,9 @@ class routine_server_class():
 
 		try:
 
-			# Call into dll
-			return_value = self.handler(*tuple(args_list))
+			# Call into dll, respecting concurrency limits of dll and routine
+			with self.dll.limit, self.limit:
+				return_value = self.handler(*tuple(args_list))
 
 		except Exception as e:
 
@@ -102,9 +106,9 @@ class routine_server_class():
 			# Push traceback to log
 			self.log.err(traceback.format_exc())
 
-			# Pack return package and return it
+			# Pack return package and return it (arguments are not synced back)
 			return {
-				'args': arg_message_list,
+				'args': [],
 				'return_value': return_value,
 				'memory': arg_memory_list,
 				'success': False,
@@ -116,11 +120,11 @@ class routine_server_class():
 			# Pack memory for return
 			self.data.server_pack_memory_list(args_list, return_value, arg_memory_list, self.memsync_d)
 
-			# Get new arg message list
-			arg_message_list = self.data.arg_list_pack(args_list, self.argtypes_d)
+			# Get new arg message list, only arguments which may have changed
+			arg_message_list = self.data.arg_list_pack_out(args_list, self.argtypes_p)
 
 			# Get new return message list
-			return_message = self.data.return_msg_pack(return_value, self.restype_d)
+			return_message = self.data.return_msg_pack(return_value, self.restype_p)
 
 			# Log status
 			self.log.out('[routine-server] ... done.')
@@ -145,27 +149,87 @@ class routine_server_class():
 			raise e
 
 
-	def __configure__(self, argtypes_d, restype_d, memsync_d):
+	def call_scalar(self, arg_block):
+
+		# Log status
+		self.log.out('[routine-server] Trying call routine "%s" with scalar arguments ...', self.name)
+
+		try:
+
+			# Call into dll directly, respecting concurrency limits of dll and routine
+			with self.dll.limit, self.limit:
+				return self.handler(*self.scalar_struct.unpack(arg_block))
+
+		except Exception as e:
+
+			# Push traceback to log
+			self.log.err(traceback.format_exc())
+
+			raise e
+
+
+	def call_many(self, call_list):
+
+		# Log status
+		self.log.out('[routine-server] Trying call routine "%s" %d times ...', self.name, len(call_list))
+
+		return_list = []
+
+		# Run calls in order
+		for arg_message_list, arg_memory_list in call_list:
+
+			return_dict = self(arg_message_list, arg_memory_list)
+			return_list.append(return_dict)
 
-		# Store argtype definition dict
-		self.argtypes_d = argtypes_d
+			# Stop after the first failing call
+			if not return_dict['success']:
+				break
 
-		# Store return value definition dict
-		self.restype_d = restype_d
+		return return_list
+
+
+	def __configure__(self, argtypes_w, restype_w, memsync_d, layouts_d, concurrency = None, types_list = []):
+
+		# Register new types, store argtype and return value definition dicts
+		self.argtypes_d, self.restype_d = self.data.unpack_definition_message(argtypes_w, restype_w, types_list)
 
 		# Store memory sync instructions
 		self.memsync_d = self.data.unpack_definition_memsync(memsync_d)
 
+		# Limit concurrent calls if required
+		if concurrency != self.limit.limit:
+			self.limit = concurrency_limit_class(concurrency)
+
 		try:
 
 			# Parse and apply argtype definition dict to actual ctypes routine
-			_argtypes = self.data.unpack_definition_argtypes(argtypes_d)
+			_argtypes = self.data.unpack_definition_argtypes(self.argtypes_d)
 			# Only configure if there are definitions, otherwise calls with int parameters without definition fail
 			if len(_argtypes) > 0:
 				self.handler.argtypes = _argtypes
 
 			# Parse and apply restype definition dict to actual ctypes routine
-			self.handler.restype = self.data.unpack_definition_returntype(restype_d)
+			self.handler.restype = self.data.unpack_definition_returntype(self.restype_d)
+
+			# Agree on raw transfers for arguments and return value with identical memory layouts
+			result = {
+				'argtypes': [
+					self.data.apply_definition_layout(arg_d, layout)
+					for arg_d, layout in zip(self.argtypes_d, layouts_d['argtypes'])
+					],
+				'restype': self.data.apply_definition_layout(self.restype_d, layouts_d['restype'])
+				}
+
+			# Compile definitions into call plans for arguments and return value
+			self.argtypes_p = self.data.arg_list_compile(self.argtypes_d)
+			self.restype_p = self.data.return_msg_compile(self.restype_d)
+
+			# Plain scalar arguments and return value can skip packing and syncing
+			scalar_format = None
+			if len(self.memsync_d) == 0:
+				scalar_format = self.data.get_definition_scalar_format(self.argtypes_d, self.restype_d)
+			self.scalar_struct = struct.Struct(scalar_format) if scalar_format is not None else None
+			result['scalar'] = scalar_format
 
 		except Exception as e:
 
@@ -175,8 +239,11 @@ class routine_server_class():
 			raise e
 
 		# Log status
-		self.log.out(' memsync: \n%s' % pf(self.memsync_d))
-		self.log.out(' argtypes: \n%s' % pf(self.handler.argtypes))
-		self.log.out(' argtypes_d: \n%s' % pf(self.argtypes_d))
-		self.log.out(' restype: \n%s' % pf(self.handler.restype))
-		self.log.out(' restype_d: \n%s' % pf(self.restype_d))
+		if self.log.is_enabled():
+			self.log.out(' memsync: \n%s', pf(self.memsync_d))
+			self.log.out(' argtypes: \n%s', pf(self.handler.argtypes))
+			self.log.out(' argtypes_d: \n%s', pf(self.argtypes_d))
+			self.log.out(' restype: \n%s', pf(self.handler.restype))
+			self.log.out(' restype_d: \n%s', pf(self.restype_d))
+
+		return result
@@ -31,76 +31,393 @@ specific language governing rights and limitations under the License.
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+from concurrent.futures import Future
+import io
+from itertools import count
+from multiprocessing import Pipe
 from multiprocessing.connection import (
 	Client,
-	Listener
+	Listener,
+	wait
+	)
+import pickle
+import queue
+import socket
+import struct
+from threading import (
+	Condition,
+	Lock,
+	Thread,
+	local
 	)
-from threading import Thread
-import time
 import traceback
 
+from .const import (
+	RPC_BUFFER_MIN,
+	RPC_PICKLE_PROTOCOL
+	)
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# WORKER STATE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+# Server, whose pool of workers the current thread belongs to (if any)
+__worker_state__ = local()
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# FRAMING
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def __rpc_buffer__(index):
+
+	# Pickled by reference as placeholder for out-of-band buffers, rpc_unpickler_class resolves it to the buffer
+	raise RuntimeError('out-of-band buffer %d must be resolved by rpc_unpickler_class' % index)
+
+
+class rpc_unpickler_class(pickle.Unpickler):
+
+
+	def __init__(self, data, buffers):
+
+		super().__init__(io.BytesIO(data))
+		self.buffers = buffers
+
+
+	def find_class(self, module, name):
+
+		# Module name of placeholder differs between Unix and Wine side
+		if name == '__rpc_buffer__':
+			return self.buffers.__getitem__
+
+		return super().find_class(module, name)
+
+
+def receive_message(connection):
+
+	# Header: number of buffers, their lengths and the pickled message
+	header = connection.recv_bytes()
+	buffers_len, = struct.unpack_from('!I', header)
+
+	# Fast path without out-of-band buffers
+	if buffers_len == 0:
+		return pickle.loads(header[4:])
+
+	# Receive buffers straight from the socket into pre-allocated memory
+	lengths = struct.unpack_from('!%dQ' % buffers_len, header, 4)
+	buffers = [bytearray(length) for length in lengths]
+	s = socket.socket(fileno = connection.fileno())
+	try:
+		for buffer in buffers:
+			view = memoryview(buffer)
+			while len(view) > 0:
+				received = s.recv_into(view)
+				if received == 0:
+					raise EOFError()
+				view = view[received:]
+	finally:
+		# Socket belongs to connection, do not close it
+		s.detach()
+
+	return rpc_unpickler_class(header[4 + 8 * buffers_len:], buffers).load()
+
+
+def send_message(connection, message):
+
+	# Large memory sections (bytearray or memoryview) are collected and sent after the header
+	buffers = []
+
+	def reduce_buffer(buffer):
+		buffer = memoryview(buffer)
+		if buffer.nbytes < RPC_BUFFER_MIN:
+			return (bytearray, (buffer.tobytes(),))
+		buffers.append(buffer)
+		return (__rpc_buffer__, (len(buffers) - 1,))
+
+	# Pickle message with placeholders for large memory sections
+	f = io.BytesIO()
+	pickler = pickle.Pickler(f, RPC_PICKLE_PROTOCOL)
+	pickler.dispatch_table = {bytearray: reduce_buffer, memoryview: reduce_buffer}
+	pickler.dump(message)
+
+	# Send header: number of buffers, their lengths and the pickled message
+	connection.send_bytes(b''.join([
+		struct.pack('!I%dQ' % len(buffers), len(buffers), *[buffer.nbytes for buffer in buffers]),
+		f.getbuffer()
+		]))
+
+	if len(buffers) == 0:
+		return
+
+	# Send buffers straight from memory to the socket
+	s = socket.socket(fileno = connection.fileno())
+	try:
+		for buffer in buffers:
+			s.sendall(buffer)
+	finally:
+		# Socket belongs to connection, do not close it
+		s.detach()
+
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASSES AND CONSTRUCTOR ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-def mp_client_safe_connect(socket_path, authkey, timeout_after_seconds = 30, wait_for_seconds = 0.01):
+def get_socket_family(socket_path):
 
-	# Already waited for ...
-	started_waiting_at = time.time()
+	# Tuples (host, port) are TCP sockets (required for Wine), strings are Unix socket paths
+	if isinstance(socket_path, tuple):
+		return 'AF_INET'
+	return 'AF_UNIX'
 
-	# Run loop until socket appears
-	while True:
 
-		# Try to connect to server and get its status
-		try:
-			# Fire up xmlrpc client
-			mp_client = mp_client_class(socket_path, authkey)
-			# Get status from server and return handle
-			if mp_client.__get_handler_status__():
-				return mp_client
-		except:
-			pass
+def set_tcp_nodelay(connection):
+
+	# Do not hold back small messages (e.g. second part of a large message) for acknowledgement
+	s = socket.socket(socket.AF_INET, socket.SOCK_STREAM, fileno = connection.fileno())
+	try:
+		s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+	finally:
+		# Socket belongs to connection, do not close it
+		s.detach()
+
 
-		# Break the loop after timeout
-		if time.time() >= (started_waiting_at + timeout_after_seconds):
-			break
+def mp_client_safe_connect(socket_path, authkey):
 
-		# Wait before trying again
-		time.sleep(wait_for_seconds)
+	# Servers only signal readiness once they are listening, so there is no need to retry
+	try:
+		# Fire up client
+		mp_client = mp_client_class(socket_path, authkey)
+		# Get status from server
+		status = mp_client.__get_handler_status__()
+	except Exception as e:
+		raise ConnectionError('could not connect to RPC server at %r: %s' % (socket_path, e)) from e
 
-	# If client could not connect, raise an error
-	raise # TODO
+	# Return handle if server is up
+	if not status:
+		raise ConnectionError('RPC server at %r is not ready' % (socket_path,))
+	return mp_client
 
 
 class mp_client_class:
 
 
-	def __init__(self, socket_path, authkey):
+	def __init__(self, socket_path, authkey, connections_max = 16):
+
+		# Store parameters for opening further connections
+		self.socket_path = socket_path
+		self.authkey = authkey.encode('utf-8')
+		self.connections_max = connections_max
+
+		# Guards the pool of connections and pending requests
+		self.__lock__ = Condition()
+
+		# Connections, which are currently not in use
+		self.__connections_idle__ = []
+
+		# Number of open connections, idle or in use
+		self.__connections_count__ = 0
 
-		# Start new client on top of socket
-		self.client = Client(socket_path, authkey = authkey.encode('utf-8'))
+		# Source of unique request ids
+		self.__request_ids__ = count()
+
+		# Connections with an outstanding asynchronous request: (request id, future)
+		self.__pending__ = {}
+
+		# Background thread receiving answers to asynchronous requests, started on demand
+		self.__receiver__ = None
+		self.__wakeup_r__, self.__wakeup_w__ = None, None
+
+		# Open first connection right away (fails if server is not up)
+		self.__connections_idle__.append(self.__connect__())
+		self.__connections_count__ += 1
 
 
 	def __getattr__(self, name):
 
-		# Handler routine in __getattr__ namespace
+		# Handler routine for name
+		do_rpc = self.__get_rpc__(name)
+
+		# Cache handler routine, __getattr__ will not be invoked again for this name
+		setattr(self, name, do_rpc)
+
+		# Return pointer to handler routine
+		return do_rpc
+
+
+	def __get_rpc__(self, name):
+
+		# Handler routine for name (str) or handle (int) of remote function
 		def do_rpc(*args, **kwargs):
 
+			return self.__call_remote__(name, args, kwargs)
+
+		return do_rpc
+
+
+	def __call_remote__(self, name, args, kwargs):
+
+		# Get exclusive access to a connection
+		connection = self.__checkout__()
+		request_id = next(self.__request_ids__)
+
+		# A worker waiting for the answer frees its place in its pool (e.g. for callbacks calling back into DLLs)
+		server = getattr(__worker_state__, 'server', None)
+		if server is not None:
+			server.__worker_blocked__(True)
+
+		try:
 			# Send request to server
-			self.client.send((name, args, kwargs))
+			send_message(connection, (request_id, name, args, kwargs))
 			# Receive answer
-			result = self.client.recv()
+			response_id, result = receive_message(connection)
+		except:
+			# State of connection is unknown, drop it
+			self.__discard__(connection)
+			raise
+		finally:
+			if server is not None:
+				server.__worker_blocked__(False)
 
-			# If the answer is an error, raise it
-			if isinstance(result, Exception):
-				raise result
+		# Answer must belong to request, otherwise the connection is out of sync
+		if response_id != request_id:
+			self.__discard__(connection)
+			raise OSError('RPC response %r does not match request %r' % (response_id, request_id))
 
-			# Return answer
-			return result
+		# Connection is free again
+		self.__checkin__(connection)
+
+		# If the answer is an error, raise it
+		if isinstance(result, Exception):
+			raise result
+
+		# Return answer
+		return result
+
+
+	def __request__(self, name, *args, **kwargs):
+
+		# Future, which will hold the answer
+		future = Future()
+
+		# Get exclusive access to a connection
+		connection = self.__checkout__()
+		request_id = next(self.__request_ids__)
+
+		try:
+			# Send request to server
+			send_message(connection, (request_id, name, args, kwargs))
+		except:
+			# State of connection is unknown, drop it
+			self.__discard__(connection)
+			raise
+
+		# Hand connection over to receiver thread
+		with self.__lock__:
+			self.__pending__[connection] = (request_id, future)
+			if self.__receiver__ is None:
+				self.__wakeup_r__, self.__wakeup_w__ = Pipe(duplex = False)
+				self.__receiver__ = Thread(target = self.__receive__)
+				self.__receiver__.daemon = True
+				self.__receiver__.start()
+			else:
+				self.__wakeup_w__.send_bytes(b'')
+
+		return future
+
+
+	def __checkin__(self, connection):
+
+		with self.__lock__:
+			self.__connections_idle__.append(connection)
+			self.__lock__.notify()
+
+
+	def __checkout__(self):
+
+		with self.__lock__:
+			while True:
+				# Re-use idle connection
+				if len(self.__connections_idle__) > 0:
+					return self.__connections_idle__.pop()
+				# Open a new connection if limit has not been reached
+				if self.__connections_count__ < self.connections_max:
+					self.__connections_count__ += 1
+					break
+				# Wait for a connection to become idle
+				self.__lock__.wait()
+
+		try:
+			return self.__connect__()
+		except:
+			with self.__lock__:
+				self.__connections_count__ -= 1
+				self.__lock__.notify()
+			raise
+
+
+	def __connect__(self):
+
+		connection = Client(self.socket_path, authkey = self.authkey)
+
+		if get_socket_family(self.socket_path) == 'AF_INET':
+			set_tcp_nodelay(connection)
+
+		return connection
 
-		# Return pointer to handler routine
-		return do_rpc
+
+	def __discard__(self, connection):
+
+		with self.__lock__:
+			self.__connections_count__ -= 1
+			self.__lock__.notify()
+
+		try:
+			connection.close()
+		except:
+			pass
+
+
+	def __receive__(self):
+
+		while True:
+
+			# Wait for answers on all connections with pending requests
+			with self.__lock__:
+				connections = list(self.__pending__.keys())
+			ready = wait(connections + [self.__wakeup_r__])
+
+			for connection in ready:
+
+				# List of connections has changed
+				if connection is self.__wakeup_r__:
+					connection.recv_bytes()
+					continue
+
+				with self.__lock__:
+					request_id, future = self.__pending__.pop(connection)
+
+				try:
+					response_id, result = receive_message(connection)
+				except Exception as e:
+					self.__discard__(connection)
+					future.set_exception(e)
+					continue
+
+				# Answers are matched to their requests by id, otherwise the connection is out of sync
+				if response_id != request_id:
+					self.__discard__(connection)
+					future.set_exception(OSError('RPC response %r does not match request %r' % (response_id, request_id)))
+					continue
+
+				# Connection is free again
+				self.__checkin__(connection)
+
+				if isinstance(result, Exception):
+					future.set_exception(result)
+				else:
+					future.set_result(result)
 
 
 class mp_server_handler_class:
@@ -111,8 +428,15 @@ class mp_server_handler_class:
 		# cache for registered functions
 		self.__functions__ = {}
 
+		# Functions registered by handle, indexed by handle
+		self.__handles__ = []
+		self.__handles_lock__ = Lock()
+
+		# Names of functions controlling the server, which never wait for a worker
+		self.__control__ = set()
+
 		# Method for verifying server status
-		self.register_function(self.__get_handler_status__)
+		self.register_function(self.__get_handler_status__, control = True)
 
 
 	def __get_handler_status__(self):
@@ -120,7 +444,7 @@ class mp_server_handler_class:
 		return True
 
 
-	def register_function(self, function_pointer, public_name = None):
+	def register_function(self, function_pointer, public_name = None, control = False):
 
 		# Is there a custom public name?
 		if public_name is not None:
@@ -131,32 +455,66 @@ class mp_server_handler_class:
 		# Register function in dict
 		self.__functions__[function_name] = function_pointer
 
+		# Control functions (e.g. status, terminate) are handled right away
+		if control:
+			self.__control__.add(function_name)
+
+
+	def register_handle(self, function_pointer):
+
+		# Register function under a compact integer handle instead of a name (handles are unique across threads)
+		with self.__handles_lock__:
+			self.__handles__.append(function_pointer)
+			return len(self.__handles__) - 1
+
+
+	def is_control(self, message):
+
+		# Does the request control the server?
+		return message[1] in self.__control__
+
 
 	def handle_connection(self, connection_client):
 
+		# Handle requests one after another until client disconnects
+		while self.handle_request(connection_client):
+			pass
+
+
+	def handle_request(self, connection_client):
+
 		try:
+			# Receive the incomming message
+			message = receive_message(connection_client)
+		except EOFError:
+			# Client has disconnected
+			return False
 
-			while True:
+		return self.handle_message(connection_client, message)
 
-				# Receive the incomming message
-				function_name, args, kwargs = connection_client.recv()
 
-				# Run the RPC and send a response
-				try:
-					r = self.__functions__[function_name](*args,**kwargs)
-					connection_client.send(r)
-				except Exception as e:
-					connection_client.send(e)
+	def handle_message(self, connection_client, message):
 
-		except EOFError:
+		# Unpack request
+		request_id, function_name, args, kwargs = message
 
-			pass
+		# Run the RPC and send a response
+		try:
+			if type(function_name) is int:
+				r = self.__handles__[function_name](*args, **kwargs)
+			else:
+				r = self.__functions__[function_name](*args, **kwargs)
+			send_message(connection_client, (request_id, r))
+		except Exception as e:
+			send_message(connection_client, (request_id, e))
+
+		return True
 
 
 class mp_server_class():
 
 
-	def __init__(self, socket_path, authkey, log = None, terminate_function = None):
+	def __init__(self, socket_path, authkey, log = None, terminate_function = None, workers = None):
 
 		# Set log, likely None
 		self.log = log
@@ -174,11 +532,18 @@ class mp_server_class():
 		# Set terminate func - to be called on termination. Likely None.
 		self.terminate_function = terminate_function
 
+		# Number of threads handling requests, None for one thread per connection
+		self.workers = workers
+
+		# Socket is opened by listen
+		self.server = None
+
 		# Set up handler
 		self.handler = mp_server_handler_class()
 
 		# Directly pass functions into handler
 		self.register_function = self.handler.register_function
+		self.register_handle = self.handler.register_handle
 
 		# Status log
 		if self.log is not None:
@@ -206,10 +571,24 @@ class mp_server_class():
 				self.log.out('[mp-server] TERMINATED.')
 
 
+	def listen(self):
+
+		# Open socket once, clients can connect from now on (even before connections are accepted)
+		if self.server is None:
+			self.server = Listener(self.socket_path, authkey = self.authkey, backlog = 64)
+
+			# Actual address, i.e. the port if port 0 was requested
+			self.socket_path = self.server.address
+
+
 	def serve_forever(self):
 
 		# Open socket
-		self.server = Listener(self.socket_path, authkey = self.authkey)
+		self.listen()
+
+		# Start pool of workers if required
+		if self.workers is not None:
+			self.__start_workers__()
 
 		# Server while server is up
 		while self.up:
@@ -218,6 +597,13 @@ class mp_server_class():
 
 				# Accept new client
 				client = self.server.accept()
+				if get_socket_family(self.socket_path) == 'AF_INET':
+					set_tcp_nodelay(client)
+
+				# Pass client to pool of workers
+				if self.workers is not None:
+					self.__release_connection__(client)
+					continue
 
 				# Handle incomming message in new thread
 				t = Thread(target = self.handler.handle_connection, args = (client,))
@@ -226,12 +612,155 @@ class mp_server_class():
 
 			except Exception:
 
+				# Connections waking up a terminating server fail quietly
+				if not self.up:
+					break
+
 				# TODO just print traceback. Better solution?
 				traceback.print_exc()
 
 
+	def __dispatch__(self):
+
+		while True:
+
+			# Wait for requests on all connections, which are not handled by a worker
+			with self.__idle_lock__:
+				connections = list(self.__idle__)
+			ready = wait(connections + [self.__wakeup_r__])
+
+			for connection in ready:
+
+				# List of connections has changed
+				if connection is self.__wakeup_r__:
+					connection.recv_bytes()
+					continue
+
+				with self.__idle_lock__:
+					self.__idle__.remove(connection)
+
+				try:
+					# Receive the incomming message
+					message = receive_message(connection)
+				except EOFError:
+					# Client has disconnected
+					connection.close()
+					continue
+				except Exception:
+					traceback.print_exc()
+					connection.close()
+					continue
+
+				# Control requests (e.g. status, terminate) are handled right away, even if all workers are busy
+				if self.handler.is_control(message):
+					self.__work_on__(connection, message)
+					continue
+
+				# Never blocks, requests wait in the queue until a worker picks them up
+				self.__queue__.put((connection, message))
+
+
+	def __release_connection__(self, connection):
+
+		# Wait for next request on connection
+		with self.__idle_lock__:
+			self.__idle__.append(connection)
+		self.__wakeup_w__.send_bytes(b'')
+
+
+	def __start_workers__(self):
+
+		# Connections waiting for their next request
+		self.__idle__ = []
+		self.__idle_lock__ = Lock()
+
+		# Wakes up dispatcher if list of waiting connections has changed
+		self.__wakeup_r__, self.__wakeup_w__ = Pipe(duplex = False)
+
+		# Connections with a request, which has not been picked up by a worker yet
+		self.__queue__ = queue.Queue()
+
+		# Number of running workers and of workers waiting for the other side (e.g. in callbacks)
+		self.__workers_running__ = 0
+		self.__workers_blocked__ = 0
+		self.__workers_lock__ = Lock()
+
+		# Start dispatcher
+		t = Thread(target = self.__dispatch__)
+		t.daemon = True
+		t.start()
+
+		# Start workers
+		with self.__workers_lock__:
+			for _ in range(self.workers):
+				self.__start_worker__()
+
+
+	def __start_worker__(self):
+
+		# Caller holds lock on workers
+		self.__workers_running__ += 1
+		t = Thread(target = self.__work__)
+		t.daemon = True
+		t.start()
+
+
+	def __work__(self):
+
+		# Calls to the other side from this thread report to this server
+		__worker_state__.server = self
+
+		while True:
+
+			# Get connection with pending request
+			connection, message = self.__queue__.get()
+
+			# Handle exactly one request, then wait for the next one on this connection
+			self.__work_on__(connection, message)
+
+			# Workers started for blocked workers stop once there are enough again
+			with self.__workers_lock__:
+				if self.__workers_running__ - self.__workers_blocked__ > self.workers:
+					self.__workers_running__ -= 1
+					return
+
+
+	def __work_on__(self, connection, message):
+
+		try:
+			self.handler.handle_message(connection, message)
+		except Exception:
+			traceback.print_exc()
+			# Connection is broken
+			connection.close()
+			return
+
+		# Wait for next request on connection
+		self.__release_connection__(connection)
+
+
+	def __worker_blocked__(self, blocked):
+
+		with self.__workers_lock__:
+
+			# Worker resumes
+			if not blocked:
+				self.__workers_blocked__ -= 1
+				return
+
+			# Worker waits for the other side, e.g. in a callback, which may call back into a DLL
+			self.__workers_blocked__ += 1
+
+			# Keep the number of workers, which are able to pick up requests
+			if self.__workers_running__ - self.__workers_blocked__ < self.workers:
+				self.__start_worker__()
+
+
 	def server_forever_in_thread(self, daemon = True):
 
+		# Open socket before returning, so readiness can be signaled right away
+		self.listen()
+
 		# Start the server in its own thread
 		t = Thread(target = self.serve_forever)
 		t.daemon = daemon
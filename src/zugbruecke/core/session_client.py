@@ -38,20 +38,32 @@ from ctypes import (
 	_FUNCFLAG_USE_LASTERROR
 	)
 import os
+import pickle
 import signal
+import threading
 import time
 
 from .const import _FUNCFLAG_STDCALL
 from .config import get_module_config
-from .data import data_class
+from .data import (
+	data_class,
+	pinned_memory_class,
+	shared_memory_class,
+	streamed_memory_class
+	)
+from .daemon import (
+	DAEMON_AUTHKEY,
+	get_daemon_socket_path
+	)
 from .dll_client import dll_client_class
-from .interpreter import interpreter_session_class
-from .lib import (
-	get_free_port,
-	get_location_of_file
+from .interpreter import (
+	get_server_command,
+	interpreter_session_class
 	)
+from .lib import get_hash_of_string
 from .log import log_class
 from .rpc import (
+	mp_client_class,
 	mp_client_safe_connect,
 	mp_server_class
 	)
@@ -185,15 +197,20 @@ class session_client_class():
 			dll_param['use_errno'] = False
 		if 'use_last_error' not in dll_param.keys():
 			dll_param['use_last_error'] = False
+		if 'concurrency' not in dll_param.keys():
+			dll_param['concurrency'] = None
 
 		# Log status
-		self.log.out('[session-client] Attaching to DLL file "%s" with calling convention "%s" ...' % (dll_name, dll_type))
+		self.log.out('[session-client] Attaching to DLL file "%s" with calling convention "%s" ...', dll_name, dll_type)
+
+		# Prototypes of routines cached by earlier sessions
+		cache_path, prototypes = self.__read_prototype_cache__(dll_name, dll_type)
 
 		try:
 
-			# Tell wine about the dll and its type
-			hash_id = self.rpc_client.load_library(
-				dll_name, dll_type, dll_param
+			# Tell wine about the dll and its type, preload cached prototypes
+			hash_id, stamp, declaration_list = self.rpc_client.load_library(
+				dll_name, dll_type, dll_param, prototypes
 				)
 
 		except OSError as e:
@@ -209,6 +226,9 @@ class session_client_class():
 			self, dll_name, dll_type, hash_id
 			)
 
+		# Attach preloaded routines
+		self.dll_dict[dll_name].__preload__(cache_path, stamp, prototypes, declaration_list)
+
 		# Log status
 		self.log.out('[session-client] ... attached.')
 
@@ -236,6 +256,16 @@ class session_client_class():
 		return self.rpc_client.path_wine_to_unix(in_path)
 
 
+	def pin(self, buffer):
+
+		# If in stage 1, fire up stage 2
+		if self.stage == 1:
+			self.__init_stage_2__()
+
+		# Mirror buffer on Wine side
+		return self.pinned_memory.client_pin(self.rpc_client, buffer)
+
+
 	def set_parameter(self, parameter):
 
 		self.p.update(parameter)
@@ -253,18 +283,30 @@ class session_client_class():
 			# Only if in stage 2:
 			if self.stage == 2:
 
-				# Wait for server to appear
-				self.__wait_for_server_status_change__(target_status = False)
+				# Remember prototypes of routines for future sessions
+				for dll in self.dll_dict.values():
+					dll.__write_prototype_cache__()
 
 				# Tell server via message to terminate
 				self.rpc_client.terminate()
 
-				# Destruct interpreter session
-				self.interpreter_session.terminate()
+				# Wait for server to disappear
+				self.__wait_for_server_status_change__(target_status = False)
+
+				# Hand server back to daemon or destruct interpreter session
+				if self.daemon_client is not None:
+					self.daemon_client.release(self.server_id)
+				else:
+					self.interpreter_session.terminate()
 
 			# Terminate callback server
 			self.rpc_server.terminate()
 
+			# Forget pinned buffers and remove shared memory segments
+			self.pinned_memory.terminate()
+			self.shared_memory.terminate()
+			self.streamed_memory.terminate()
+
 			# Log status
 			self.log.out('[session-client] TERMINATED.')
 
@@ -283,6 +325,9 @@ class session_client_class():
 		# Get and set session id
 		self.id = self.p['id']
 
+		# Guards server status, notifies waiting threads of changes
+		self.server_status = threading.Condition()
+
 		# Start RPC server for callback routines
 		self.__start_rpc_server__()
 
@@ -291,14 +336,31 @@ class session_client_class():
 
 		# Log status
 		self.log.out('[session-client] STARTING (STAGE 1) ...')
-		self.log.out('[session-client] Configured Wine-Python version is %s for %s.' % (self.p['version'], self.p['arch']))
-		self.log.out('[session-client] Log socket port: %d.' % self.p['port_socket_unix'])
+		self.log.out('[session-client] Configured Wine-Python version is %s for %s.', self.p['version'], self.p['arch'])
+		self.log.out('[session-client] Log socket port: %d.', self.p['port_socket_unix'])
 
 		# Store current working directory
 		self.dir_cwd = os.getcwd()
 
+		# Connection to daemon, if a pre-booted server is used
+		self.daemon_client = None
+
+		# Offer shared memory for large memsync buffers
+		self.shared_memory = shared_memory_class(self.id, threshold = self.p['memsync_shared'])
+
+		# Keep track of buffers pinned on the Wine side
+		self.pinned_memory = pinned_memory_class(self.shared_memory)
+
+		# Stream large memory sections in chunks, offer them to the Wine side
+		self.streamed_memory = streamed_memory_class(self.p)
+		self.rpc_server.register_function(self.streamed_memory.read, 'read_stream')
+
 		# Set data cache and parser
-		self.data = data_class(self.log, is_server = False, callback_server = self.rpc_server)
+		self.data = data_class(
+			self.log, is_server = False, callback_server = self.rpc_server,
+			shared_memory = self.shared_memory, pinned_memory = self.pinned_memory,
+			streamed_memory = self.streamed_memory
+			)
 
 		# Set up a dict for loaded dlls
 		self.dll_dict = {}
@@ -309,6 +371,9 @@ class session_client_class():
 		# Marking server component as down
 		self.server_up = False
 
+		# Exit code of Wine-Python, None while it is running
+		self.server_exit_code = None
+
 		# Set current stage to 1
 		self.stage = 1
 
@@ -330,6 +395,17 @@ class session_client_class():
 		# Log status
 		self.log.out('[session-client] STARTING (STAGE 2) ...')
 
+		# Try to get a pre-booted server from daemon first
+		if self.p['daemon'] and self.__attach_to_daemon__():
+
+			# Set current stage to 2
+			self.stage = 2
+
+			# Log status
+			self.log.out('[session-client] STARTED (STAGE 2).')
+
+			return
+
 		# Install wine-python
 		setup_wine_python(self.p['arch'], self.p['version'], self.p['dir'])
 
@@ -341,7 +417,9 @@ class session_client_class():
 		self.__prepare_python_command__()
 
 		# Initialize interpreter session
-		self.interpreter_session = interpreter_session_class(self.id, self.p, self.log)
+		self.interpreter_session = interpreter_session_class(
+			self.id, self.p, self.log, on_exit = self.__set_server_exit_code__
+			)
 
 		# Wait for server to appear
 		self.__wait_for_server_status_change__(target_status = True)
@@ -356,10 +434,85 @@ class session_client_class():
 		self.log.out('[session-client] STARTED (STAGE 2).')
 
 
-	def __set_server_status__(self, status):
+	def __attach_to_daemon__(self):
+
+		# Log status
+		self.log.out('[session-client] Asking daemon for server ...')
+
+		try:
+
+			# Connect to daemon
+			daemon_client = mp_client_class(get_daemon_socket_path(self.p['dir']), DAEMON_AUTHKEY)
+
+			# Get idle server
+			server = daemon_client.acquire(self.p['arch'], self.p['version'], self.p['dir'])
+
+		except Exception as e:
+
+			# Log status
+			self.log.out('[session-client] ... no daemon (%s), starting server.', str(e))
+
+			return False
+
+		# Store daemon and server
+		self.daemon_client = daemon_client
+		self.server_id = server['id']
+		self.p['port_socket_wine'] = server['port_socket_wine']
+
+		# Connect to Wine side
+		self.__start_rpc_client__()
+
+		# Hand server over to session
+		self.rpc_client.attach(
+			self.id, self.p['port_socket_unix'],
+			{'log_level': self.p['log_level'], 'log_write': self.p['log_write'], 'memsync_stream': self.p['memsync_stream']},
+			self.dir_cwd
+			)
+
+		# Server is up for this session
+		self.server_up = True
+
+		# Log status
+		self.log.out('[session-client] ... got server "%s".', self.server_id)
+
+		return True
+
+
+	def __read_prototype_cache__(self, dll_name, dll_type):
+
+		# Cache is optional
+		if not self.p['prototype_cache']:
+			return None, None
+
+		# One cache file per DLL, Wine Python and working directory (DLL names may be relative)
+		cache_path = os.path.join(self.p['dir'], 'prototypes', get_hash_of_string(repr((
+			self.p['arch'], self.p['version'], os.getcwd(), dll_name, dll_type
+			))) + '.pickle')
+
+		# Missing or broken cache files are ignored
+		try:
+			with open(cache_path, 'rb') as f:
+				return cache_path, pickle.load(f)
+		except Exception:
+			return cache_path, None
+
+
+	def __set_server_exit_code__(self, exit_code):
+
+		# Interface for interpreter session: Wine-Python has exited
+		with self.server_status:
+			self.server_exit_code = exit_code
+			self.server_status.notify_all()
+
+
+	def __set_server_status__(self, session_id, status, port_socket_wine = None):
 
 		# Interface for session server through RPC
-		self.server_up = status
+		with self.server_status:
+			if port_socket_wine is not None:
+				self.p['port_socket_wine'] = port_socket_wine
+			self.server_up = status
+			self.server_status.notify_all()
 
 
 	def __start_rpc_client__(self):
@@ -370,15 +523,15 @@ class session_client_class():
 			'zugbruecke_wine'
 			)
 
+		# Streams offered by the Wine side are read through this client
+		self.streamed_memory.rpc_client = self.rpc_client
 
-	def __start_rpc_server__(self):
 
-		# Get socket for callback bridge
-		self.p['port_socket_unix'] = get_free_port()
+	def __start_rpc_server__(self):
 
-		# Create server
+		# Create server, port is picked by the operating system
 		self.rpc_server = mp_server_class(
-			('localhost', self.p['port_socket_unix']),
+			('localhost', 0),
 			'zugbruecke_unix'
 			) # Log is added later
 
@@ -388,24 +541,17 @@ class session_client_class():
 		# Start server into its own thread
 		self.rpc_server.server_forever_in_thread()
 
+		# Get socket for callback bridge
+		self.p['port_socket_unix'] = self.rpc_server.socket_path[1]
+
 
 	def __prepare_python_command__(self):
 
-		# Get socket for ctypes bridge
-		self.p['port_socket_wine'] = get_free_port()
+		# Socket for ctypes bridge is picked by the server and reported with its status
+		self.p['port_socket_wine'] = 0
 
 		# Prepare command with minimal meta info. All other info can be passed via sockets.
-		self.p['command_dict'] = [
-			os.path.join(
-				os.path.abspath(os.path.join(get_location_of_file(__file__), os.pardir)),
-				'_server_.py'
-				),
-			'--id', self.id,
-			'--port_socket_wine', str(self.p['port_socket_wine']),
-			'--port_socket_unix', str(self.p['port_socket_unix']),
-			'--log_level', str(self.p['log_level']),
-			'--log_write', str(int(self.p['log_write']))
-			]
+		self.p['command_dict'] = get_server_command(self.id, self.p)
 
 
 	def __wait_for_server_status_change__(self, target_status):
@@ -420,36 +566,41 @@ class session_client_class():
 		STATUS_DICT = {True: 'up', False: 'down'}
 
 		# Log status
-		self.log.out('[session-client] Waiting for session-server to be %s ...' % STATUS_DICT[target_status])
+		self.log.out('[session-client] Waiting for session-server to be %s ...', STATUS_DICT[target_status])
 
-		# Time-step
-		wait_for_seconds = 0.01
 		# Timeout
 		timeout_after_seconds = 30.0
 		# Already waited for ...
 		started_waiting_at = time.time()
 
-		# Run loop until socket appears
-		while not self.server_up:
-
-			# Wait before trying again
-			time.sleep(wait_for_seconds)
+		# Sleep until server reports its status or Wine-Python exits
+		with self.server_status:
+			self.server_status.wait_for(
+				lambda: self.server_up == target_status or self.server_exit_code is not None,
+				timeout = timeout_after_seconds
+				)
 
-			# Time out
-			if time.time() >= (started_waiting_at + timeout_after_seconds):
-				break
+		# An exited server is down
+		if not target_status and self.server_exit_code is not None:
+			self.server_up = False
 
-		# Handle timeout
-		if not self.server_up:
+		# Handle exit of Wine-Python and timeout
+		if self.server_up != target_status:
 
 			# Log status
-			self.log.out('[session-client] ... wait timed out (after %0.2f seconds).' %
-				(time.time() - started_waiting_at)
+			self.log.out('[session-client] ... wait failed (after %0.2f seconds).',
+				time.time() - started_waiting_at
 				)
 
-			raise # TODO
+			if self.server_exit_code is not None:
+				raise OSError('Wine-Python exited with code %d before session-server was %s, see log for details' % (
+					self.server_exit_code, STATUS_DICT[target_status]
+					))
+			raise TimeoutError('session-server was not %s after %0.2f seconds' % (
+				STATUS_DICT[target_status], timeout_after_seconds
+				))
 
 		# Log status
-		self.log.out('[session-client] ... session server is %s (after %0.2f seconds).' %
-			(STATUS_DICT[target_status], time.time() - started_waiting_at)
+		self.log.out('[session-client] ... session server is %s (after %0.2f seconds).',
+			STATUS_DICT[target_status], time.time() - started_waiting_at
 			)
@@ -32,10 +32,16 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import ctypes
+import os
 import time
 import traceback
 
-from .data import data_class
+from .data import (
+	data_class,
+	pinned_memory_class,
+	shared_memory_class,
+	streamed_memory_class
+	)
 from .dll_server import dll_server_class
 from .log import log_class
 from .path import path_class
@@ -88,41 +94,99 @@ class session_server_class:
 			'oledll': ctypes.OleDLL
 			}
 
+		# Map shared memory segments offered by the Unix side
+		self.shared_memory = shared_memory_class(self.id, path_unix_to_wine = self.path_unix_to_wine)
+
+		# Keep mirrors of buffers pinned by the Unix side
+		self.pinned_memory = pinned_memory_class(self.shared_memory)
+
+		# Stream large memory sections in chunks
+		self.streamed_memory = streamed_memory_class(self.p, rpc_client = self.rpc_client)
+
 		# Set data cache and parser
-		self.data = data_class(self.log, is_server = True, callback_client = self.rpc_client)
+		self.data = data_class(
+			self.log, is_server = True, callback_client = self.rpc_client,
+			shared_memory = self.shared_memory, pinned_memory = self.pinned_memory,
+			streamed_memory = self.streamed_memory
+			)
 
 		# Create server
 		self.rpc_server = mp_server_class(
 			('localhost', self.p['port_socket_wine']),
 			'zugbruecke_wine',
 			log = self.log,
-			terminate_function = self.__terminate__
+			terminate_function = self.__terminate__,
+			workers = self.p['server_workers']
 			)
 
+		# Hand server over to a session (if started by daemon)
+		self.rpc_server.register_function(self.__attach__, 'attach')
 		# Register call: Accessing a dll
 		self.rpc_server.register_function(self.__load_library__, 'load_library')
 		# Expose routine for updating parameters
 		self.rpc_server.register_function(self.__set_parameter__, 'set_parameter')
 		# Register destructur: Call goes into xmlrpc-server first, which then terminates parent
-		self.rpc_server.register_function(self.rpc_server.terminate, 'terminate')
+		self.rpc_server.register_function(self.rpc_server.terminate, 'terminate', control = True)
 		# Convert path: Unix to Wine
 		self.rpc_server.register_function(self.path_unix_to_wine, 'path_unix_to_wine')
 		# Convert path: Wine to Unix
 		self.rpc_server.register_function(self.path_wine_to_unix, 'path_wine_to_unix')
+		# Mirror pinned buffers
+		self.rpc_server.register_function(self.pinned_memory.server_pin, 'pin_buffer')
+		self.rpc_server.register_function(self.pinned_memory.server_pull, 'pull_buffer')
+		self.rpc_server.register_function(self.pinned_memory.server_push, 'push_buffer')
+		self.rpc_server.register_function(self.pinned_memory.server_unpin, 'unpin_buffer')
+		# Read streamed memory sections
+		self.rpc_server.register_function(self.streamed_memory.read, 'read_stream')
 
 		# Expose ctypes stuff
 		self.__expose_ctypes_routines__()
 
+		# Run server ...
+		self.rpc_server.server_forever_in_thread(daemon = False)
+
+		# Port might have been picked by the operating system
+		self.p['port_socket_wine'] = self.rpc_server.socket_path[1]
+
 		# Status log
-		self.log.out('[session-server] ctypes server is listening on port %d.' % self.p['port_socket_wine'])
+		self.log.out('[session-server] ctypes server is listening on port %d.', self.p['port_socket_wine'])
 		self.log.out('[session-server] STARTED.')
 		self.log.out('[session-server] Serve forever ...')
 
-		# Run server ...
-		self.rpc_server.server_forever_in_thread(daemon = False)
+		# Indicate to session client that the server is up and where to find it
+		self.rpc_client.set_server_status(self.id, True, self.p['port_socket_wine'])
 
-		# Indicate to session client that the server is up
-		self.rpc_client.set_server_status(True)
+
+	def __attach__(self, session_id, port_socket_unix, parameter, dir_cwd):
+		"""
+		Exposed interface
+		"""
+
+		# Status log
+		self.log.out('[session-server] Attaching to session "%s" ...', session_id)
+
+		# Take over id and parameters of session
+		self.id = session_id
+		self.p.update(parameter)
+		self.p['port_socket_unix'] = port_socket_unix
+
+		# Connect to Unix side of session
+		self.rpc_client = mp_client_safe_connect(
+			('localhost', self.p['port_socket_unix']),
+			'zugbruecke_unix'
+			)
+
+		# Log and callbacks now go to session
+		self.log.id = self.id
+		self.log.client = self.rpc_client
+		self.data.callback_client = self.rpc_client
+		self.streamed_memory.rpc_client = self.rpc_client
+
+		# Relative DLL paths are resolved against the session's working directory
+		os.chdir(self.path_unix_to_wine(dir_cwd))
+
+		# Status log
+		self.log.out('[session-server] ... attached.')
 
 
 	def __expose_ctypes_routines__(self):
@@ -139,19 +203,19 @@ class session_server_class:
 			self.rpc_server.register_function(getattr(ctypes, routine), 'ctypes_' + routine)
 
 
-	def __load_library__(self, dll_name, dll_type, dll_param):
+	def __load_library__(self, dll_name, dll_type, dll_param, prototypes = None):
 		"""
 		Exposed interface
 		"""
 
 		# Although this should happen only once per dll, lets be on the safe side
 		if dll_name in self.dll_dict.keys():
-			return (True, self.dll_dict[dll_name].hash_id) # Success & dll hash_id
+			return self.dll_dict[dll_name].hash_id, self.dll_dict[dll_name].__get_stamp__(), []
 
 		# Status log
-		self.log.out('[session-server] Attaching to DLL file "%s" with calling convention "%s" ...' % (
+		self.log.out('[session-server] Attaching to DLL file "%s" with calling convention "%s" ...',
 			dll_name, dll_type
-			))
+			)
 
 		try:
 
@@ -179,14 +243,17 @@ class session_server_class:
 
 		# Load library
 		self.dll_dict[dll_name] = dll_server_class(
-			self, dll_name, dll_type, handler
+			self, dll_name, dll_type, handler, dll_param.get('concurrency', None)
 			)
 
 		# Log status
 		self.log.out('[session-server] ... attached.')
 
-		# Return success and dll's hash id
-		return self.dll_dict[dll_name].hash_id
+		# Configure routines from cached prototypes
+		stamp, declaration_list = self.dll_dict[dll_name].__preload__(prototypes)
+
+		# Return dll's hash id, stamp of dll file and preloaded routines
+		return self.dll_dict[dll_name].hash_id, stamp, declaration_list
 
 
 	def __set_parameter__(self, parameter):
@@ -205,6 +272,11 @@ class session_server_class:
 			# Status log
 			self.log.out('[session-server] TERMINATING ...')
 
+			# Drop mirrors of pinned buffers and unmap shared memory segments
+			self.pinned_memory.terminate()
+			self.shared_memory.terminate()
+			self.streamed_memory.terminate()
+
 			# Terminate log
 			self.log.terminate()
 
@@ -215,4 +287,4 @@ class session_server_class:
 			self.log.out('[session-server] TERMINATED.')
 
 			# Indicate to session client that server was terminated
-			self.rpc_client.set_server_status(False)
+			self.rpc_client.set_server_status(self.id, False)
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	src/zugbruecke/core/session_shard.py: Spreading calls across multiple sessions
+
+	Required to run on platform / side: [UNIX]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from ctypes import LibraryLoader
+from itertools import count
+import threading
+
+from .session_client import session_client_class
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# SHARDED SESSION CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class session_shard_class():
+
+
+	def __init__(self, parameter = {}, workers = 2, dispatch = 'least_load', force = False):
+
+		# Check parameters
+		if not isinstance(workers, int) or workers < 1:
+			raise ValueError('workers must be a positive integer')
+		if dispatch not in ('least_load', 'round_robin'):
+			raise ValueError('dispatch must be "least_load" or "round_robin"')
+
+		# Store dispatch strategy
+		self.dispatch = dispatch
+
+		# Every shard is a session with its own Wine Python interpreter and id
+		self.shards = []
+		for index in range(workers):
+			shard_parameter = parameter.copy()
+			if 'id' in shard_parameter.keys():
+				shard_parameter['id'] = '%s_%d' % (parameter['id'], index)
+			self.shards.append(session_client_class(parameter = shard_parameter, force = force))
+
+		# Set up a dict for loaded dlls
+		self.dll_dict = {}
+
+		# Set up and expose dll library loader objects
+		self.cdll = LibraryLoader(lambda name: self.load_library(name, 'cdll'))
+		self.windll = LibraryLoader(lambda name: self.load_library(name, 'windll'))
+		self.oledll = LibraryLoader(lambda name: self.load_library(name, 'oledll'))
+
+
+	def load_library(self, dll_name, dll_type, dll_param = {}):
+
+		# Check whether dll has already been touched
+		if dll_name in self.dll_dict.keys():
+
+			# Return reference on existing dll object
+			return self.dll_dict[dll_name]
+
+		# Load dll in every shard
+		self.dll_dict[dll_name] = dll_shard_class(self, dll_name, [
+			shard.load_library(dll_name, dll_type, dll_param.copy()) for shard in self.shards
+			])
+
+		return self.dll_dict[dll_name]
+
+
+	def set_parameter(self, parameter):
+
+		# Every shard gets the same parameters
+		for shard in self.shards:
+			shard.set_parameter(parameter)
+
+
+	def terminate(self):
+
+		# Shut down all shards one by one
+		for shard in self.shards:
+			shard.terminate()
+
+
+	@property
+	def up(self):
+
+		return any(shard.up for shard in self.shards)
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# SHARDED DLL CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dll_shard_class():
+
+
+	def __init__(self, parent_session, dll_name, dlls):
+
+		# Store name, sharded session and one dll per shard
+		self.name = dll_name
+		self.session = parent_session
+		self.dlls = dlls
+
+		# Start dict for dll routines
+		self.routines = {}
+
+
+	def declare(self, prototypes):
+
+		# Declare routines in every shard
+		for dll in self.dlls:
+			dll.declare(prototypes)
+
+
+	def __getattr__(self, name):
+
+		if name.startswith('__') and name.endswith('__'):
+			raise AttributeError(name)
+
+		return self[name]
+
+
+	def __getitem__(self, name_or_ordinal):
+
+		# Is it in dict?
+		if name_or_ordinal in self.routines.keys():
+			return self.routines[name_or_ordinal]
+
+		# Attach to routine in every shard
+		self.routines[name_or_ordinal] = routine_shard_class(
+			self, name_or_ordinal, [dll[name_or_ordinal] for dll in self.dlls]
+			)
+
+		return self.routines[name_or_ordinal]
+
+
+	def __repr__(self):
+
+		return repr(self.dlls[0])
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# SHARDED ROUTINE CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class routine_shard_class():
+
+
+	def __init__(self, parent_dll, routine_name, routines):
+
+		# Store name, sharded dll and one routine per shard
+		self.name = routine_name
+		self.dll = parent_dll
+		self.routines = routines
+
+		# Dispatch strategy of session
+		if self.dll.session.dispatch == 'round_robin':
+			self.__choose__ = self.__choose_round_robin__
+		else:
+			self.__choose__ = self.__choose_least_load__
+
+		# Next shard in round robin order
+		self.__turn__ = count()
+
+		# Number of calls in flight per shard
+		self.__load__ = [0 for _ in self.routines]
+		self.__load_lock__ = threading.Lock()
+
+
+	def __call__(self, *args):
+
+		# Pick a shard and run call there
+		index = self.__choose__()
+		try:
+			return self.routines[index](*args)
+		finally:
+			self.__done__(index)
+
+
+	def acall(self, *args, loop = None):
+
+		# Pick a shard, it is released once the future is done
+		index = self.__choose__()
+		try:
+			result = self.routines[index].acall(*args, loop = loop)
+		except:
+			self.__done__(index)
+			raise
+		result.add_done_callback(lambda result: self.__done__(index))
+		return result
+
+
+	def call_many(self, args_iterable):
+
+		# Split calls into one contiguous chunk per shard
+		args_list = list(args_iterable)
+		size = -(-len(args_list) // len(self.routines))
+		chunks = [args_list[start:start + size] for start in range(0, len(args_list), max(size, 1))]
+
+		# Results and errors per chunk
+		results = [None for _ in chunks]
+		errors = [None for _ in chunks]
+
+		def run_chunk(index):
+			with self.__load_lock__:
+				self.__load__[index] += 1
+			try:
+				results[index] = self.routines[index].call_many(chunks[index])
+			except Exception as e:
+				errors[index] = e
+			finally:
+				self.__done__(index)
+
+		# Run chunks in parallel, one per shard
+		threads = [threading.Thread(target = run_chunk, args = (index,)) for index in range(len(chunks))]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		# Raise the error of the first failing chunk
+		for error in errors:
+			if error is not None:
+				raise error
+
+		return [return_value for result in results for return_value in result]
+
+
+	def __choose_least_load__(self):
+
+		# Shard with fewest calls in flight
+		with self.__load_lock__:
+			index = self.__load__.index(min(self.__load__))
+			self.__load__[index] += 1
+		return index
+
+
+	def __choose_round_robin__(self):
+
+		# Shards take turns
+		index = next(self.__turn__) % len(self.routines)
+		with self.__load_lock__:
+			self.__load__[index] += 1
+		return index
+
+
+	def __done__(self, index):
+
+		with self.__load_lock__:
+			self.__load__[index] -= 1
+
+
+	def __set_on_all__(self, name, value):
+
+		for routine in self.routines:
+			setattr(routine, name, value)
+
+
+	@property
+	def argtypes(self):
+
+		return self.routines[0].argtypes
+
+
+	@argtypes.setter
+	def argtypes(self, value):
+
+		self.__set_on_all__('argtypes', value)
+
+
+	@property
+	def concurrency(self):
+
+		return self.routines[0].concurrency
+
+
+	@concurrency.setter
+	def concurrency(self, value):
+
+		self.__set_on_all__('concurrency', value)
+
+
+	@property
+	def memsync(self):
+
+		return self.routines[0].memsync
+
+
+	@memsync.setter
+	def memsync(self, value):
+
+		self.__set_on_all__('memsync', value)
+
+
+	@property
+	def paramflags(self):
+
+		return self.routines[0].paramflags
+
+
+	@paramflags.setter
+	def paramflags(self, value):
+
+		self.__set_on_all__('paramflags', value)
+
+
+	@property
+	def restype(self):
+
+		return self.routines[0].restype
+
+
+	@restype.setter
+	def restype(self, value):
+
+		self.__set_on_all__('restype', value)
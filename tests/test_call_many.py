@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_call_many.py: Test batches of calls in one round trip
+
+	Required to run on platform / side: [UNIX]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES AND ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class sample_class:
+
+
+	def __init__(self):
+
+		self.__dll__ = ctypes.windll.LoadLibrary('tests/demo_dll.dll')
+
+		# int gcd(int, int)
+		self.gcd = self.__dll__.cookbook_gcd
+		self.gcd.argtypes = (ctypes.c_int, ctypes.c_int)
+		self.gcd.restype = ctypes.c_int
+
+		# int divide(int, int, int *)
+		self.divide = self.__dll__.cookbook_divide
+		self.divide.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_int))
+		self.divide.restype = ctypes.c_int
+
+		# void bubblesort(float *, int n)
+		self.bubblesort = self.__dll__.bubblesort
+		self.bubblesort.memsync = [
+			{
+				'p': [0],
+				'l': [1],
+				't': 'c_float'
+				}
+			]
+		self.bubblesort.argtypes = (ctypes.POINTER(ctypes.c_float), ctypes.c_int)
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'call_many is specific to zugbruecke')
+def test_call_many_return_values():
+
+	sample = sample_class()
+
+	assert [7, 1, 5] == sample.gcd.call_many([(35, 42), (7, 9), (25, 10)])
+	assert [] == sample.gcd.call_many([])
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'call_many is specific to zugbruecke')
+def test_call_many_pointers():
+
+	sample = sample_class()
+
+	rems = [ctypes.c_int() for _ in range(3)]
+	quots = sample.divide.call_many([(x, 3, rem) for x, rem in zip([10, 11, 12], rems)])
+
+	assert [3, 3, 4] == quots
+	assert [1, 2, 0] == [rem.value for rem in rems]
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'call_many is specific to zugbruecke')
+def test_call_many_memsync():
+
+	sample = sample_class()
+
+	arrays = [(ctypes.c_float * 3)(3, 1, 2), (ctypes.c_float * 4)(9, 7, 8, 6)]
+	sample.bubblesort.call_many([
+		(ctypes.cast(array, ctypes.POINTER(ctypes.c_float)), len(array)) for array in arrays
+		])
+
+	assert [1.0, 2.0, 3.0] == arrays[0][:]
+	assert [6.0, 7.0, 8.0, 9.0] == arrays[1][:]
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_call_scalar.py: Test routines with plain scalar arguments and return values
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def test_call_scalar():
+
+	dll = ctypes.windll.LoadLibrary('tests/demo_dll.dll')
+
+	# int gcd(int, int)
+	gcd = dll.cookbook_gcd
+	gcd.argtypes = (ctypes.c_int, ctypes.c_int)
+	gcd.restype = ctypes.c_int
+
+	# int16_t sqrt_int(int16_t)
+	sqrt_int = dll.sqrt_int
+	sqrt_int.argtypes = (ctypes.c_int16,)
+	sqrt_int.restype = ctypes.c_int16
+
+	assert 7 == gcd(35, 42)
+	assert 3 == sqrt_int(9)
+
+	# Arguments as ctypes objects
+	assert 7 == gcd(ctypes.c_int(35), 42)
+	assert 3 == sqrt_int(ctypes.c_int16(9))
+
+
+def test_call_scalar_wrong_args():
+
+	dll = ctypes.windll.LoadLibrary('tests/demo_dll.dll')
+
+	gcd = dll.cookbook_gcd
+	gcd.argtypes = (ctypes.c_int, ctypes.c_int)
+	gcd.restype = ctypes.c_int
+
+	with pytest.raises(TypeError):
+		gcd(35)
+
+	with pytest.raises((TypeError, ctypes.ArgumentError)):
+		gcd(35, 'a')
+
+
+def test_call_scalar_float_out_of_range():
+
+	dll = ctypes.windll.LoadLibrary('tests/demo_dll.dll')
+
+	# float simple_demo_routine(float, float), returns a - a / b
+	simple_demo_routine = dll.simple_demo_routine
+	simple_demo_routine.argtypes = (ctypes.c_float, ctypes.c_float)
+	simple_demo_routine.restype = ctypes.c_float
+
+	assert 1.5 == simple_demo_routine(3.0, 2.0)
+
+	# Does not fit into a float, ctypes turns it into infinity
+	assert 1.0 == simple_demo_routine(1.0, 1e300)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_concurrency.py: Test worker pool and concurrency limits on Wine side
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+from threading import Thread
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'concurrency limits are specific to zugbruecke')
+def test_concurrency():
+
+	# More threads than workers on Wine side
+	session = ctypes.session(parameter = {'server_workers': 2})
+	dll = session.load_library('tests/demo_dll.dll', 'windll', {'concurrency': 2})
+
+	# int gcd(int, int)
+	gcd = dll.cookbook_gcd
+	gcd.argtypes = (ctypes.c_int, ctypes.c_int)
+	gcd.restype = ctypes.c_int
+	gcd.concurrency = 1
+
+	results = []
+
+	def worker():
+		for _ in range(50):
+			results.append(gcd(35, 42) == 7)
+
+	threads = [Thread(target = worker) for _ in range(8)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+	assert len(results) == 8 * 50
+	assert all(results)
+
+	session.terminate()
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'concurrency limits are specific to zugbruecke')
+def test_concurrency_invalid():
+
+	gcd = ctypes.windll.LoadLibrary('tests/demo_dll.dll').cookbook_gcd
+
+	with pytest.raises(ValueError):
+		gcd.concurrency = 0
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'worker pools are specific to zugbruecke')
+def test_concurrency_callback_nested():
+
+	# Only one worker on Wine side, which is blocked by the outer call
+	session = ctypes.session(parameter = {'server_workers': 1})
+	dll = session.load_library('tests/demo_dll.dll', 'windll')
+
+	# int gcd(int, int)
+	gcd = dll.cookbook_gcd
+	gcd.argtypes = (ctypes.c_int, ctypes.c_int)
+	gcd.restype = ctypes.c_int
+
+	conveyor_belt = ctypes.WINFUNCTYPE(ctypes.c_int16, ctypes.c_int16)
+
+	# int16_t sum_elements_from_callback(int16_t, conveyor_belt)
+	sum_elements_from_callback = dll.sum_elements_from_callback
+	sum_elements_from_callback.argtypes = (ctypes.c_int16, conveyor_belt)
+	sum_elements_from_callback.restype = ctypes.c_int16
+
+	# Callback calls back into DLL
+	@conveyor_belt
+	def get_data(index):
+		return gcd(35, 42) * index
+
+	assert 7 * sum(range(10)) == sum_elements_from_callback(10, get_data)
+
+	session.terminate()
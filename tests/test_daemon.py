@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_daemon.py: Test sessions with pre-booted servers from daemon
+
+	Required to run on platform / side: [UNIX]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+	from zugbruecke.core.daemon import daemon_class
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES AND ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_gcd(session):
+
+	dll = session.load_library('tests/demo_dll.dll', 'windll')
+
+	# int gcd(int, int)
+	gcd = dll.cookbook_gcd
+	gcd.argtypes = (ctypes.c_int, ctypes.c_int)
+	gcd.restype = ctypes.c_int
+
+	return gcd
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'daemon is specific to zugbruecke')
+def test_daemon():
+
+	daemon = daemon_class()
+	t = threading.Thread(target = daemon.serve_forever)
+	t.daemon = True
+	t.start()
+
+	# Socket is only accessible by owner
+	assert 0 == stat.S_IMODE(os.stat(daemon.socket_path).st_mode) & 0o077
+
+	# Second session gets a fresh server, servers are not shared between sessions
+	for _ in range(2):
+
+		session = ctypes.session(parameter = {'daemon': True})
+		gcd = get_gcd(session)
+
+		assert session.daemon_client is not None
+		assert 7 == gcd(35, 42)
+
+		session.terminate()
+
+	daemon.terminate()
+	t.join(10.0)
+	assert not t.is_alive()
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'daemon is specific to zugbruecke')
+def test_daemon_missing():
+
+	# Without daemon, session starts its own server
+	session = ctypes.session(parameter = {'daemon': True})
+	gcd = get_gcd(session)
+
+	assert session.daemon_client is None
+	assert 7 == gcd(35, 42)
+
+	session.terminate()
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'daemon is specific to zugbruecke')
+def test_daemon_terminate_while_booting():
+
+	daemon = daemon_class()
+	t = threading.Thread(target = daemon.serve_forever)
+	t.daemon = True
+	t.start()
+
+	booting = threading.Event()
+	booted = threading.Event()
+	killed = []
+
+	class interpreter_class:
+		def terminate(self):
+			killed.append(True)
+
+	# Server finishes booting after the daemon went down
+	def boot_server(key):
+		booting.set()
+		booted.wait()
+		return {'id': 'late', 'key': key, 'interpreter': interpreter_class()}
+	daemon.__boot_server__ = boot_server
+
+	daemon.__refill_pool_in_thread__(('win32', '3.7.4', daemon.p['dir']))
+	assert daemon.serving.wait(5.0)
+	assert booting.wait(5.0)
+	daemon.terminate()
+	booted.set()
+
+	# Server is shut down instead of being added to the pool
+	for _ in range(50):
+		if killed:
+			break
+		time.sleep(0.1)
+	assert [True] == killed
+	assert {} == daemon.pools
+
+	t.join(10.0)
+	assert not t.is_alive()
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'daemon is specific to zugbruecke')
+def test_daemon_terminate_before_serving():
+
+	# Terminating (e.g. on a signal) before sessions are served must not block
+	daemon = daemon_class()
+	t = threading.Thread(target = daemon.terminate)
+	t.daemon = True
+	t.start()
+	t.join(10.0)
+
+	assert not t.is_alive()
+	assert daemon.down.is_set()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_declare.py: Test bulk declaration of routines
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES AND ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class vector3d(ctypes.Structure):
+
+
+	_fields_ = [
+		('x', ctypes.c_int16),
+		('y', ctypes.c_int16),
+		('z', ctypes.c_int16)
+		]
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'declare is specific to zugbruecke')
+def test_declare():
+
+	session = ctypes.session()
+	dll = session.load_library('tests/demo_dll.dll', 'windll')
+
+	dll.declare({
+		'cookbook_gcd': ((ctypes.c_int, ctypes.c_int), ctypes.c_int),
+		'sqrt_int': ((ctypes.c_int16,), ctypes.c_int16),
+		'vector3d_add': ((ctypes.POINTER(vector3d), ctypes.POINTER(vector3d)), ctypes.POINTER(vector3d)),
+		'square_int_array': (
+			(ctypes.POINTER(ctypes.c_int16), ctypes.c_void_p, ctypes.c_int16),
+			ctypes.c_int,
+			[
+				{'p': [0], 'l': [2], 't': 'c_int16'},
+				{'p': [1, -1], 'l': [2], 't': 'c_int16'}
+				]
+			)
+		})
+
+	assert 7 == dll.cookbook_gcd(35, 42)
+	assert 3 == dll.sqrt_int(9)
+
+	v = dll.vector3d_add(vector3d(1, 2, 3), vector3d(4, 5, 6)).contents
+	assert (5, 7, 9) == (v.x, v.y, v.z)
+
+	in_array_p = ctypes.cast(
+		ctypes.pointer((ctypes.c_int16 * 3)(1, 2, 3)),
+		ctypes.POINTER(ctypes.c_int16)
+		)
+	out_array_p = ctypes.pointer(ctypes.c_void_p())
+	dll.square_int_array(in_array_p, out_array_p, ctypes.c_int16(3))
+	assert [1, 4, 9] == ctypes.cast(out_array_p.contents, ctypes.POINTER(ctypes.c_int16 * 3)).contents[:]
+
+	session.terminate()
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'declare is specific to zugbruecke')
+def test_declare_errors():
+
+	dll = ctypes.windll.LoadLibrary('tests/demo_dll.dll')
+
+	with pytest.raises(ValueError):
+		dll.declare({'cookbook_gcd': ((ctypes.c_int, ctypes.c_int),)})
+
+	with pytest.raises(AttributeError):
+		dll.declare({'this_routine_does_not_exist': ((), ctypes.c_int)})
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_log.py: Test writing and shipping of log messages
+
+	Required to run on platform / side: [UNIX]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import json
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	from zugbruecke.core.log import log_class
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES AND ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class client_class:
+
+
+	def __init__(self):
+
+		self.messages = []
+
+
+	def transfer_messages(self, messages):
+
+		self.messages.extend(messages)
+
+
+def get_log(**kwargs):
+
+	parameter = {'stdout': False, 'stderr': False, 'log_level': 1, 'log_write': True}
+	return log_class('test', parameter, **kwargs)
+
+
+def read_logfile(name):
+
+	with open(name, 'r') as f:
+		return [json.loads(line)['cnt'] for line in f]
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'log is specific to zugbruecke')
+def test_log_files(tmpdir, monkeypatch):
+
+	monkeypatch.chdir(tmpdir)
+	log = get_log()
+
+	log.out('first')
+	log.terminate()
+
+	# Logfiles are closed on termination, later messages are still written
+	assert not log.__files__
+	log.out('second')
+	assert not log.__files__
+
+	assert ['first', 'second'] == read_logfile('UNIX_out.txt')
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'log is specific to zugbruecke')
+def test_log_ship(tmpdir, monkeypatch):
+
+	monkeypatch.chdir(tmpdir)
+	client = client_class()
+	log = get_log(rpc_client = client)
+
+	for index in range(1000):
+		log.out('message %d' % index)
+	log.terminate()
+
+	# All messages queued before termination are shipped
+	assert ['message %d' % index for index in range(1000)] == [message['cnt'] for message in client.messages]
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'log is specific to zugbruecke')
+def test_log_unknown_pipe(tmpdir, monkeypatch):
+
+	monkeypatch.chdir(tmpdir)
+	log = get_log()
+
+	with pytest.raises(ValueError):
+		log.__print_message__({'time': 0.0, 'id': 'test', 'platform': 'UNIX', 'pipe': 'xyz', 'cnt': 'message'})
+
+	log.terminate()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_memsync_direction.py: Test memsync directions and changed ranges
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES AND ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def bubblesort(values, **memsync_options):
+
+	# Fresh session, routine is configured with these options
+	session = ctypes.session()
+	dll = session.load_library('tests/demo_dll.dll', 'windll')
+
+	# void bubblesort(float *, int n)
+	routine = dll.bubblesort
+	memsync_d = {'p': [0], 'l': [1], 't': 'c_float'}
+	memsync_d.update(memsync_options)
+	routine.memsync = [memsync_d]
+	routine.argtypes = (ctypes.POINTER(ctypes.c_float), ctypes.c_int)
+
+	ctypes_float_values = ((ctypes.c_float)*len(values))(*values)
+	ctypes_float_pointer_firstelement = ctypes.cast(
+		ctypes.pointer(ctypes_float_values), ctypes.POINTER(ctypes.c_float)
+		)
+	try:
+		routine(ctypes_float_pointer_firstelement, len(values))
+	finally:
+		session.terminate()
+
+	return ctypes_float_values[:]
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'memsync directions are specific to zugbruecke')
+@pytest.mark.parametrize('memsync_options', [{'d': 'inout'}, {'d': 'inout', 'x': True}, {'x': True}])
+def test_memsync_direction_inout(memsync_options):
+
+	# Only the last two elements are out of order, i.e. one block changes
+	values = [float(i) for i in range(8192)]
+	values[-2], values[-1] = values[-1], values[-2]
+
+	assert bubblesort(values, **memsync_options) == sorted(values)
+
+	# Every block changes
+	values = [float(i) for i in range(8192, 0, -1)]
+
+	assert bubblesort(values, **memsync_options) == sorted(values)
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'memsync directions are specific to zugbruecke')
+def test_memsync_direction_in():
+
+	values = [3.0, 1.0, 2.0]
+
+	# Memory is not synced back
+	assert bubblesort(values, d = 'in') == values
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'memsync directions are specific to zugbruecke')
+def test_memsync_direction_out():
+
+	values = [3.0, 1.0, 2.0]
+
+	# Memory is not sent, routine sorts zeros
+	assert bubblesort(values, d = 'out') == [0.0, 0.0, 0.0]
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'memsync directions are specific to zugbruecke')
+def test_memsync_direction_error():
+
+	with pytest.raises(ValueError):
+		bubblesort([1.0], d = 'sideways')
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_memsync_large.py: Test memsync with large memory sections
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES AND ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class vector3d(ctypes.Structure):
+
+
+	_fields_ = [
+		('x', ctypes.c_int16),
+		('y', ctypes.c_int16),
+		('z', ctypes.c_int16)
+		]
+
+
+class sample_class:
+
+
+	def __init__(self):
+
+		self.__dll__ = ctypes.windll.LoadLibrary('tests/demo_dll.dll')
+
+		self.__vector3d_add_array__ = self.__dll__.vector3d_add_array
+		self.__vector3d_add_array__.argtypes = (ctypes.POINTER(vector3d), ctypes.c_int16)
+		self.__vector3d_add_array__.restype = ctypes.POINTER(vector3d)
+		self.__vector3d_add_array__.memsync = [
+			{
+				'p': [0],
+				'l': ([1],),
+				'f': 'lambda x: x * 3',
+				't': 'c_int16'
+				}
+			]
+
+
+	def vector3d_add_array(self, v_ctypes):
+
+		result = self.__vector3d_add_array__(
+			ctypes.cast(ctypes.pointer(v_ctypes), ctypes.POINTER(vector3d)), len(v_ctypes)
+			)
+
+		return (result.contents.x, result.contents.y, result.contents.z)
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def test_memsync_large():
+
+	# About 180 kB, i.e. sent out-of-band in both directions
+	length = 30000
+
+	v_ctypes = (vector3d * length)()
+	for i in range(length):
+		v_ctypes[i].x, v_ctypes[i].y, v_ctypes[i].z = 1, i % 2, -(i % 3)
+
+	sample = sample_class()
+
+	assert (length, length // 2, -(length // 3) * 3) == sample.vector3d_add_array(v_ctypes)
+
+	# Memory is synced back unchanged
+	assert all(
+		(v_ctypes[i].x, v_ctypes[i].y, v_ctypes[i].z) == (1, i % 2, -(i % 3))
+		for i in range(length)
+		)
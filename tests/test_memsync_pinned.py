@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_memsync_pinned.py: Test memsync through pinned buffers
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'pinned buffers are specific to zugbruecke')
+@pytest.mark.parametrize('memsync_shared', [0, 1])
+def test_memsync_pinned(memsync_shared):
+
+	session = ctypes.session(parameter = {'memsync_shared': memsync_shared})
+	dll = session.load_library('tests/demo_dll.dll', 'windll')
+
+	# void bubblesort(float *, int n)
+	bubblesort = dll.bubblesort
+	bubblesort.memsync = [{'p': [0], 'l': [1], 't': 'c_float'}]
+	bubblesort.argtypes = (ctypes.POINTER(ctypes.c_float), ctypes.c_int)
+
+	values = (ctypes.c_float * 6)(5.0, 4.0, 3.0, 2.0, 1.0, 0.0)
+	pointer = ctypes.cast(ctypes.pointer(values), ctypes.POINTER(ctypes.c_float))
+
+	pinned = session.pin(values)
+
+	# Mirror is sorted, buffer only once pulled
+	bubblesort(pointer, len(values))
+	assert values[:] == [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+	pinned.pull()
+	assert values[:] == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+
+	# Push changed range, sort section of buffer
+	values[0] = 9.0
+	pinned.push(0, 4)
+	bubblesort(pointer, 3)
+	pinned.pull(0, 12)
+	assert values[:] == [1.0, 2.0, 9.0, 3.0, 4.0, 5.0]
+
+	with pytest.raises(ValueError):
+		pinned.push(4, 100)
+
+	# Unpinned buffers are synced with every call again
+	pinned.unpin()
+	values[0], values[1] = 7.0, 6.0
+	bubblesort(pointer, len(values))
+	assert values[:] == [3.0, 4.0, 5.0, 6.0, 7.0, 9.0]
+
+	with pytest.raises(ValueError):
+		pinned.pull()
+
+	session.terminate()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_memsync_shared.py: Test memory sync through shared memory
+
+	Required to run on platform / side: [UNIX]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import os
+import stat
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES AND ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class sample_class:
+
+
+	def __init__(self, session):
+
+		self.__dll__ = session.load_library('tests/demo_dll.dll', 'windll')
+
+		# void bubblesort(float *, int n)
+		self.__bubblesort__ = self.__dll__.bubblesort
+		self.__bubblesort__.memsync = [
+			{
+				'p': [0],
+				'l': [1],
+				't': 'c_float'
+				}
+			]
+		self.__bubblesort__.argtypes = (ctypes.POINTER(ctypes.c_float), ctypes.c_int)
+
+
+	def bubblesort(self, values):
+
+		ctypes_float_values = ((ctypes.c_float)*len(values))(*values)
+		ctypes_float_pointer_firstelement = ctypes.cast(
+			ctypes.pointer(ctypes_float_values), ctypes.POINTER(ctypes.c_float)
+			)
+		self.__bubblesort__(ctypes_float_pointer_firstelement, len(values))
+		values[:] = ctypes_float_values[:]
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'shared memory is specific to zugbruecke')
+def test_memsync_shared():
+
+	session = ctypes.session(parameter = {'memsync_shared': 1})
+	sample = sample_class(session)
+
+	# Second round re-uses the shared memory segment of the first round
+	for _ in range(2):
+
+		test_vector = [5.74, 3.72, 6.28, 8.6, 9.34, 6.47, 2.05, 9.09, 4.39, 4.75]
+		sample.bubblesort(test_vector)
+		test_vector = [round(element, 2) for element in test_vector]
+		result_vector = [2.05, 3.72, 4.39, 4.75, 5.74, 6.28, 6.47, 8.6, 9.09, 9.34]
+		vector_diff = sum([abs(test_vector[index] - result_vector[index]) for index in range(len(result_vector))])
+
+		assert pytest.approx(0.0, 0.0000001) == vector_diff
+
+	session.terminate()
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'shared memory is specific to zugbruecke')
+def test_memsync_shared_call_many():
+
+	session = ctypes.session(parameter = {'memsync_shared': 1})
+	sample = sample_class(session)
+
+	values_list = [(ctypes.c_float * 3)(*values) for values in [(3, 2, 1), (6, 5, 4), (9, 8, 7)]]
+	sample.__bubblesort__.call_many([
+		(ctypes.cast(ctypes.pointer(values), ctypes.POINTER(ctypes.c_float)), 3)
+		for values in values_list
+		])
+	assert [[1, 2, 3], [4, 5, 6], [7, 8, 9]] == [values[:] for values in values_list]
+
+	# Every segment is handed back after its call has been unpacked
+	segments = list(session.shared_memory.__segments__.values())
+	assert len(segments) == len(session.shared_memory.__segments_free__)
+
+	# Segments are only accessible by their owner
+	for segment in segments:
+		assert 0o600 == stat.S_IMODE(os.stat(segment['p']).st_mode)
+
+	session.terminate()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_memsync_stream.py: Test memory sync through streams of chunks
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES AND ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class vector3d(ctypes.Structure):
+
+
+	_fields_ = [
+		('x', ctypes.c_int16),
+		('y', ctypes.c_int16),
+		('z', ctypes.c_int16)
+		]
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'streams are specific to zugbruecke')
+def test_memsync_stream():
+
+	# Sections larger than 4 kB are streamed in chunks of 4 kB
+	session = ctypes.session(parameter = {'memsync_stream': 4096})
+	dll = session.load_library('tests/demo_dll.dll', 'windll')
+
+	# void bubblesort(float *, int n)
+	bubblesort = dll.bubblesort
+	bubblesort.memsync = [{'p': [0], 'l': [1], 't': 'c_float'}]
+	bubblesort.argtypes = (ctypes.POINTER(ctypes.c_float), ctypes.c_int)
+
+	# About 40 kB, last chunk is not full
+	length = 10001
+	values = (ctypes.c_float * length)(*[float(i) for i in range(length)])
+	values[0], values[-1] = values[-1], values[0]
+
+	bubblesort(ctypes.cast(ctypes.pointer(values), ctypes.POINTER(ctypes.c_float)), length)
+	assert values[:] == [float(i) for i in range(length)]
+
+	# vector3d *vector3d_add_array(vector3d *, int16_t)
+	vector3d_add_array = dll.vector3d_add_array
+	vector3d_add_array.argtypes = (ctypes.POINTER(vector3d), ctypes.c_int16)
+	vector3d_add_array.restype = ctypes.POINTER(vector3d)
+	vector3d_add_array.memsync = [{'p': [0], 'l': ([1],), 'f': 'lambda x: x * 3', 't': 'c_int16'}]
+
+	# About 60 kB
+	length = 10000
+	v_ctypes = (vector3d * length)()
+	for i in range(length):
+		v_ctypes[i].x, v_ctypes[i].y, v_ctypes[i].z = 1, i % 2, -(i % 3)
+
+	result = vector3d_add_array(ctypes.cast(ctypes.pointer(v_ctypes), ctypes.POINTER(vector3d)), length)
+	assert (result.contents.x, result.contents.y, result.contents.z) == (length, length // 2, -(length // 3) * 3)
+
+	session.terminate()
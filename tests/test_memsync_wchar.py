@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_memsync_wchar.py: Test conversion of wchar widths in memsync
+
+	Required to run on platform / side: [UNIX]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+import ctypes
+from sys import platform
+
+if not platform.startswith('win'):
+	from zugbruecke.core.data.mem_contents import (
+		memory_contents_class,
+		WCHAR_BYTES,
+		WCHAR_CODECS
+		)
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES AND ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_other_width():
+
+	# Width of wchar on the other side, e.g. Windows (2) if this is Unix (4)
+	return 2 if WCHAR_BYTES == 4 else 4
+
+
+def overwrite(text, units):
+
+	# Caller's buffer of units wchars, followed by guard bytes
+	guard = 16
+	memory = (ctypes.c_ubyte * (units * WCHAR_BYTES + guard))(*([0xAA] * (units * WCHAR_BYTES + guard)))
+	address = ctypes.addressof(memory)
+
+	# Data written back by the other side
+	other_width = get_other_width()
+	memory_d = {
+		'd': text.encode(WCHAR_CODECS[other_width], 'surrogatepass'),
+		'l': None, 'o': units * WCHAR_BYTES, 'w': other_width,
+		'a': None, '_a': address, 'm': None, 'r': None, 'k': None, 's': None
+		}
+	memsync_d = {'w': True, 'n': False, 'd': 'inout'}
+	memory_d['l'] = len(memory_d['d'])
+
+	memory_contents_class().__unpack_memory_item_overwrite__(memory_d, memsync_d, ())
+
+	data = bytes(memory)
+	assert data[units * WCHAR_BYTES:] == bytes([0xAA] * guard) # nothing beyond buffer
+	return data[:units * WCHAR_BYTES].decode(WCHAR_CODECS[WCHAR_BYTES], 'surrogatepass')
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'wchar conversion is specific to zugbruecke')
+def test_memsync_wchar_surrogate_pairs():
+
+	text = 'a\U0001F600bé'
+	other_width = get_other_width()
+
+	memory_d = {'d': text.encode(WCHAR_CODECS[other_width]), 'l': None, 'w': other_width}
+	memory_contents_class().__adjust_wchar_length__(memory_d)
+
+	# Characters outside the BMP survive in both directions
+	assert memory_d['d'].decode(WCHAR_CODECS[WCHAR_BYTES]) == text
+	assert memory_d['l'] == len(memory_d['d'])
+	assert memory_d['w'] == WCHAR_BYTES
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'wchar conversion is specific to zugbruecke')
+def test_memsync_wchar_padded():
+
+	# Fewer wchars than buffer: padded with NUL
+	assert overwrite('ab', 4) == 'ab\0\0'
+	assert overwrite('\U0001F600', 3)[-1] == '\0'
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'wchar conversion is specific to zugbruecke')
+def test_memsync_wchar_truncated():
+
+	# More wchars than buffer: clipped to buffer
+	assert overwrite('abcdef', 2) == 'ab'
+	assert len(overwrite('\U0001F600\U0001F600\U0001F600', 2)) == 2
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_paramflags.py: Test classification of arguments as input or output
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'paramflags on routines are specific to zugbruecke')
+@pytest.mark.parametrize('paramflags,remainder', [
+	(None, 2), # Pointer is classified as output
+	((1, 1, 3), 2), # Explicitly in/out
+	((1, 1, 1), 0) # Explicitly input only, not synced back
+	])
+def test_paramflags(paramflags, remainder):
+
+	dll = ctypes.session().load_library('tests/demo_dll.dll', 'windll')
+
+	# int divide(int, int, int *)
+	divide = dll.cookbook_divide
+	divide.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_int))
+	divide.restype = ctypes.c_int
+	divide.paramflags = paramflags
+
+	rem = ctypes.c_int()
+	assert 5 == divide(42, 8, rem)
+	assert remainder == rem.value
+
+	dll.session.terminate()
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'paramflags on routines are specific to zugbruecke')
+def test_paramflags_invalid():
+
+	divide = ctypes.windll.LoadLibrary('tests/demo_dll.dll').cookbook_divide
+
+	with pytest.raises(TypeError):
+		divide.paramflags = 1
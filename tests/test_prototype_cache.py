@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_prototype_cache.py: Test on-disk cache of routine prototypes
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES AND ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class vector3d(ctypes.Structure):
+
+
+	_fields_ = [
+		('x', ctypes.c_int16),
+		('y', ctypes.c_int16),
+		('z', ctypes.c_int16)
+		]
+
+
+def configure_and_call(dll):
+
+	gcd = dll.cookbook_gcd
+	gcd.argtypes = (ctypes.c_int, ctypes.c_int)
+	gcd.restype = ctypes.c_int
+
+	vector3d_add = dll.vector3d_add
+	vector3d_add.argtypes = (ctypes.POINTER(vector3d), ctypes.POINTER(vector3d))
+	vector3d_add.restype = ctypes.POINTER(vector3d)
+
+	v = vector3d_add(vector3d(1, 2, 3), vector3d(4, 5, 6)).contents
+
+	return gcd(35, 42), (v.x, v.y, v.z)
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'prototype cache is specific to zugbruecke')
+def test_prototype_cache():
+
+	# First session configures routines and writes cache on termination
+	session = ctypes.session(parameter = {'prototype_cache': True})
+	dll = session.load_library('tests/demo_dll.dll', 'cdll')
+	assert (7, (5, 7, 9)) == configure_and_call(dll)
+	session.terminate()
+
+	# Second session finds routines preloaded on Wine side
+	session = ctypes.session(parameter = {'prototype_cache': True})
+	dll = session.load_library('tests/demo_dll.dll', 'cdll')
+	assert {'cookbook_gcd', 'vector3d_add'} <= set(dll.preloaded.keys())
+	assert (7, (5, 7, 9)) == configure_and_call(dll)
+	session.terminate()
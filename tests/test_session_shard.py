@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_session_shard.py: Test sessions sharded across multiple Wine servers
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+from threading import Thread
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'sharded sessions are specific to zugbruecke')
+@pytest.mark.parametrize('dispatch', ['least_load', 'round_robin'])
+def test_session_shard(dispatch):
+
+	session = ctypes.sharded_session(workers = 2, dispatch = dispatch)
+	dll = session.windll.LoadLibrary('tests/demo_dll.dll')
+
+	# int gcd(int, int)
+	gcd = dll.cookbook_gcd
+	gcd.argtypes = (ctypes.c_int, ctypes.c_int)
+	gcd.restype = ctypes.c_int
+
+	results = []
+
+	def worker():
+		for _ in range(25):
+			results.append(gcd(35, 42) == 7)
+
+	threads = [Thread(target = worker) for _ in range(4)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+	assert len(results) == 4 * 25
+	assert all(results)
+
+	# Calls are spread across shards, results keep their order
+	assert gcd.call_many([(x * 7, 42) for x in range(1, 8)]) == [7, 14, 21, 14, 7, 42, 7]
+
+	session.terminate()
+	assert not session.up
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'sharded sessions are specific to zugbruecke')
+def test_session_shard_memsync():
+
+	session = ctypes.sharded_session(workers = 2, dispatch = 'round_robin')
+	dll = session.windll.LoadLibrary('tests/demo_dll.dll')
+
+	# void bubblesort(float *, int n), memsync definition is shared by all shards
+	memsync = [{'p': [0], 'l': [1], 't': 'c_float'}]
+	bubblesort = dll.bubblesort
+	bubblesort.memsync = memsync
+	bubblesort.argtypes = (ctypes.POINTER(ctypes.c_float), ctypes.c_int)
+
+	for _ in range(4):
+		values = (ctypes.c_float * 3)(3, 1, 2)
+		bubblesort(ctypes.cast(ctypes.pointer(values), ctypes.POINTER(ctypes.c_float)), 3)
+		assert [1, 2, 3] == values[:]
+
+	# Definition is compiled into copies, not changed in place
+	assert [{'p': [0], 'l': [1], 't': 'c_float'}] == memsync
+
+	session.terminate()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+ZUGBRUECKE
+Calling routines in Windows DLLs from Python scripts running on unixlike systems
+https://github.com/pleiszenburg/zugbruecke
+
+	tests/test_struct_layout.py: Test raw transfers of structs and arrays with agreed memory layouts
+
+	Required to run on platform / side: [UNIX, WINE]
+
+	Copyright (C) 2017-2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU Lesser General Public License
+Version 2.1 ("LGPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/lgpl-2.1.txt
+https://github.com/pleiszenburg/zugbruecke/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import pytest
+
+from sys import platform
+if any([platform.startswith(os_name) for os_name in ['linux', 'darwin', 'freebsd']]):
+	import zugbruecke as ctypes
+elif platform.startswith('win'):
+	import ctypes
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES AND ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class layout_vector2d(ctypes.Structure):
+
+
+	_fields_ = [
+		('x', ctypes.c_int16),
+		('y', ctypes.c_int16)
+		]
+
+
+# Same memory layout as struct vector3d {int16_t x, y, z;}
+class layout_vector3d(ctypes.Structure):
+
+
+	_fields_ = [
+		('xy', layout_vector2d),
+		('z', ctypes.c_int16)
+		]
+
+
+class sample_class:
+
+
+	def __init__(self, session):
+
+		self.__dll__ = session.load_library('tests/demo_dll.dll', 'windll')
+
+		# vector3d *vector3d_add(vector3d *, vector3d *)
+		self.vector3d_add = self.__dll__.vector3d_add
+		self.vector3d_add.argtypes = (ctypes.POINTER(layout_vector3d), ctypes.POINTER(layout_vector3d))
+		self.vector3d_add.restype = ctypes.POINTER(layout_vector3d)
+
+		# void gauss_elimination(float [3][4] *, float [3] *)
+		self.gauss_elimination = self.__dll__.gauss_elimination
+		self.gauss_elimination.argtypes = (
+			ctypes.POINTER(ctypes.c_float * 4 * 3),
+			ctypes.POINTER(ctypes.c_float * 3)
+			)
+
+
+	def run(self):
+
+		v1 = layout_vector3d(layout_vector2d(1, 2), 3)
+		v2 = layout_vector3d(layout_vector2d(10, 20), 30)
+		v3 = self.vector3d_add(v1, v2).contents
+		assert (11, 22, 33) == (v3.xy.x, v3.xy.y, v3.z)
+
+		A = (ctypes.c_float * 4 * 3)((1, 2, 3, 2), (1, 1, 1, 2), (3, 3, 1, 0))
+		x = (ctypes.c_float * 3)()
+		self.gauss_elimination(ctypes.pointer(A), ctypes.pointer(x))
+		assert [5.0, -6.0, 3.0] == x[:]
+		assert [[1.0, 2.0, 3.0, 2.0], [0.0, -1.0, -2.0, 0.0], [0.0, 0.0, -2.0, -6.0]] == [row[:] for row in A]
+
+
+	def get_binary_flags(self):
+
+		return [
+			[arg_d['b'] for arg_d in routine.argtypes_d] + [routine.restype_d['b']]
+			for routine in (self.vector3d_add, self.gauss_elimination)
+			]
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# TEST(s)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'memory layout negotiation is specific to zugbruecke')
+def test_struct_layout_match():
+
+	session = ctypes.session()
+	sample = sample_class(session)
+
+	sample.run()
+
+	# Nested structs and arrays are transferred as raw memory
+	assert [[True, True, True], [True, True, False]] == sample.get_binary_flags()
+
+	session.terminate()
+
+
+@pytest.mark.skipif(platform.startswith('win'), reason = 'memory layout negotiation is specific to zugbruecke')
+def test_struct_layout_mismatch(monkeypatch):
+
+	session = ctypes.session()
+	sample = sample_class(session)
+
+	# Wine side computes different layouts
+	get_definition_layout = session.data.get_definition_layout
+	def get_definition_layout_mismatch(datatype_d_dict):
+		layout = get_definition_layout(datatype_d_dict)
+		return None if layout is None else ('mismatch', layout)
+	monkeypatch.setattr(session.data, 'get_definition_layout', get_definition_layout_mismatch)
+
+	sample.run()
+
+	# Falls back to field-by-field transfers
+	assert [[False, False, False], [False, False, False]] == sample.get_binary_flags()
+
+	session.terminate()